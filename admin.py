@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request, send_from_directory
-from config import cursor, db, SITE_DIR
+from config import SITE_DIR
+from database import get_db, get_cursor
 
 # 创建管理员蓝图
 admin_bp = Blueprint('admin', __name__)
@@ -27,6 +28,9 @@ def grant_admin():
     if not username:
         return jsonify({"success": False, "message": "用户名不能为空"})
     
+    db = get_db()
+    cursor = get_cursor()
+
     # 检查用户是否存在
     cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
     user = cursor.fetchone()
@@ -54,6 +58,9 @@ def revoke_admin():
     if not username:
         return jsonify({"success": False, "message": "用户名不能为空"})
     
+    db = get_db()
+    cursor = get_cursor()
+
     # 检查用户是否存在
     cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
     user = cursor.fetchone()
@@ -76,6 +83,7 @@ def list_users():
         return jsonify({"error": "无权限执行此操作"}), 403
     
     try:
+        cursor = get_cursor()
         cursor.execute("SELECT username, is_admin FROM users")
         users = cursor.fetchall()
         return jsonify({"success": True, "users": users})
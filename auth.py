@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request, session, redirect, url_for
 from functools import wraps
-from config import cursor, db
+from database import get_db, get_cursor
 
 # 创建认证蓝图
 auth_bp = Blueprint('auth', __name__)
@@ -26,6 +26,9 @@ def register():
     username = data.get("username")
     password = data.get("password")
 
+    db = get_db()
+    cursor = get_cursor()
+
     # 判断是否已存在
     cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
     if cursor.fetchone():
@@ -43,6 +46,7 @@ def login():
     username = data.get("username")
     password = data.get("password")
 
+    cursor = get_cursor()
     cursor.execute("SELECT * FROM users WHERE username = %s AND password = %s", (username, password))
     user = cursor.fetchone()
     if user:
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷启动导入耗时基准
+每次在全新的子进程中导入模块，统计中位数耗时
+
+用法:
+    python benchmarks/bench_import.py [-n 次数] [模块 ...]
+
+"eager" 一行模拟改造前 import config 时的行为（初始化日志并立即连接数据库），
+作为对比基线；数据库不可达时记录的是连接失败前等待的时间。
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_SNIPPET = """
+import time
+t = time.perf_counter()
+import {module}
+print(time.perf_counter() - t)
+"""
+
+EAGER_SNIPPET = """
+import time
+t = time.perf_counter()
+import config
+config.get_loggers()
+try:
+    config.get_db_connection().close()
+except Exception:
+    pass
+print(time.perf_counter() - t)
+"""
+
+def run_once(snippet: str) -> float:
+    """在新进程中执行一次并返回耗时（秒）"""
+    output = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure(snippet: str, runs: int) -> float:
+    """多次测量取中位数（毫秒）"""
+    return statistics.median(run_once(snippet) for _ in range(runs)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动导入耗时基准")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="每项测量次数")
+    parser.add_argument("modules", nargs="*", default=["config", "version"], help="要测量的模块")
+    args = parser.parse_args()
+
+    print(f"{'目标':<30}{'中位数(ms)':>12}")
+    print("-" * 42)
+    print(f"{'config (eager, 改造前)':<30}{measure(EAGER_SNIPPET, args.runs):>12.1f}")
+    for module in args.modules:
+        try:
+            elapsed = measure(LAZY_SNIPPET.format(module=module), args.runs)
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<30}{'导入失败':>12}  {e.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{module:<30}{elapsed:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源列表 JSON 序列化基准
+用构造的查询结果（默认 1000 行）比较资源列表从数据库行到 JSON 字节的两条路径的耗时中位数和内存峰值：
+
+    改造前: 字典游标行 -> AcademicResource.from_dict -> to_dict -> 标准库 json（Flask 默认设置）
+    改造后: 元组行 -> AcademicResource.from_row -> to_dict -> json_provider.dumps_bytes
+
+用法:
+    python benchmarks/bench_json.py [-n 行数] [-r 次数] [--fields summary|all]
+
+不需要数据库；安装了 orjson 时额外给出改造后路径使用标准库回退实现的结果。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.http import http_date
+import json_provider
+from modules.academic.models import AcademicResource, resolve_resource_fields, _select_columns
+
+def make_rows(count: int, columns):
+    """构造 count 行查询结果（元组），列顺序与 columns 一致"""
+    base = datetime(2024, 1, 1, 8, 30)
+    sample = {
+        'title': '基于深度学习的学术文献自动分类方法研究',
+        'authors': 'Zhang San; Li Si; Wang Wu',
+        'abstract': '本文提出一种结合预训练语言模型和图神经网络的文献分类方法。' * 12,
+        'content': '',
+        'file_path': 'uploads/academic/1/paper.pdf',
+        'file_type': 'pdf',
+        'subject': '计算机科学',
+        'keywords': json.dumps(['深度学习', '文献分类', 'graph neural network'], ensure_ascii=False),
+        'publication_year': 2023,
+        'citation_count': 12,
+        'reading_status': 'reading',
+        'notes': '第三节的实验设置值得参考。',
+        'file_size': 1048576,
+        'author_id': 1,
+        'folder_id': 3,
+        'user_category_id': None,
+    }
+    rows = []
+    for i in range(count):
+        created_at = base + timedelta(minutes=i)
+        values = dict(sample, id=i + 1, upload_time=created_at, created_at=created_at, updated_at=created_at)
+        rows.append(tuple(values[column] for column in columns))
+    return rows
+
+def _flask_default(value):
+    """改造前 Flask 默认 JSON 提供者对 datetime 的处理"""
+    if isinstance(value, datetime):
+        return http_date(value)
+    raise TypeError(type(value).__name__)
+
+def before(columns, rows, fields) -> bytes:
+    """改造前：字典游标 + from_dict + 标准库 json（sort_keys、ensure_ascii）"""
+    resources = []
+    for row in rows:
+        result = dict(zip(columns, row))
+        result['keywords'] = json.loads(result['keywords']) if result.get('keywords') else []
+        resources.append(AcademicResource.from_dict(result))
+    payload = {'success': True, 'data': {'resources': [resource.to_dict(fields) for resource in resources]}}
+    return json.dumps(payload, default=_flask_default, sort_keys=True).encode('utf-8')
+
+def after(columns, rows, fields) -> bytes:
+    """改造后：元组行 + from_row + dumps_bytes"""
+    resources = [AcademicResource.from_row(columns, row) for row in rows]
+    payload = {'success': True, 'data': {'resources': [resource.to_dict(fields) for resource in resources]}}
+    return json_provider.dumps_bytes(payload)
+
+def measure(func, args, runs: int):
+    """返回 (耗时中位数 ms, 内存峰值 KB, 输出字节数)"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = func(*args)
+        timings.append(time.perf_counter() - start)
+
+    # 内存峰值单独测一次（tracemalloc 会拖慢执行）
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings) * 1000, peak / 1024, len(output)
+
+def main():
+    parser = argparse.ArgumentParser(description="资源列表 JSON 序列化基准")
+    parser.add_argument("-n", "--rows", type=int, default=1000, help="资源行数")
+    parser.add_argument("-r", "--runs", type=int, default=20, help="测量次数")
+    parser.add_argument("--fields", default="summary", help="返回字段，同 /api/resources 的 fields 参数")
+    args = parser.parse_args()
+
+    fields = resolve_resource_fields(args.fields)
+    columns = tuple(column.strip() for column in _select_columns(fields).split(','))
+    rows = make_rows(args.rows, columns)
+
+    cases = [("改造前 (dict + json)", before), ("改造后", after)]
+    print(f"{args.rows} 行, fields={args.fields}, orjson={'是' if json_provider.ORJSON_AVAILABLE else '否'}")
+    print(f"{'路径':<28}{'耗时中位数(ms)':>16}{'内存峰值(KB)':>16}{'输出(KB)':>12}")
+    print("-" * 72)
+    for name, func in cases:
+        elapsed, peak, size = measure(func, (columns, rows, fields), args.runs)
+        print(f"{name:<28}{elapsed:>16.2f}{peak:>16.0f}{size / 1024:>12.0f}")
+
+    if json_provider.ORJSON_AVAILABLE:
+        json_provider.ORJSON_AVAILABLE = False
+        try:
+            elapsed, peak, size = measure(after, (columns, rows, fields), args.runs)
+            print(f"{'改造后 (标准库回退)':<28}{elapsed:>16.2f}{peak:>16.0f}{size / 1024:>12.0f}")
+        finally:
+            json_provider.ORJSON_AVAILABLE = True
+
+if __name__ == "__main__":
+    main()
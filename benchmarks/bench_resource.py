@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AcademicResource 内存与构造耗时基准
+比较改造前基于 __dict__ 的资源对象（字典行 + 立即解析 keywords）与改造后的元组记录（元组行 + 延迟解析）：
+每个对象占用的内存（tracemalloc 统计，不含两者共享的行数据）和构造耗时中位数
+
+用法:
+    python benchmarks/bench_resource.py [-n 对象数] [-r 次数]
+
+不需要数据库。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.academic.models import AcademicResource, RESOURCE_COLUMNS
+
+class LegacyAcademicResource:
+    """改造前的资源对象：20 个属性保存在实例 __dict__ 中"""
+
+    def __init__(self, **kwargs):
+        self.id = kwargs.get('id')
+        self.title = kwargs.get('title', '')
+        self.authors = kwargs.get('authors', '')
+        self.abstract = kwargs.get('abstract', '')
+        self.content = kwargs.get('content', '')
+        self.file_path = kwargs.get('file_path', '')
+        self.file_type = kwargs.get('file_type', 'pdf')
+        self.subject = kwargs.get('subject', '')
+        self.keywords = kwargs.get('keywords', [])
+        self.publication_year = kwargs.get('publication_year')
+        self.citation_count = kwargs.get('citation_count', 0)
+        self.reading_status = kwargs.get('reading_status', 'unread')
+        self.notes = kwargs.get('notes', '')
+        self.file_size = kwargs.get('file_size', 0)
+        self.upload_time = kwargs.get('upload_time')
+        self.author_id = kwargs.get('author_id')
+        self.folder_id = kwargs.get('folder_id')
+        self.user_category_id = kwargs.get('user_category_id')
+        self.created_at = kwargs.get('created_at')
+        self.updated_at = kwargs.get('updated_at')
+        self.tags = kwargs.get('tags', [])
+
+def make_rows(count: int):
+    """构造 SELECT * 的查询结果（元组），各行的值互不共享"""
+    base = datetime(2024, 1, 1, 8, 30)
+    rows = []
+    for i in range(count):
+        created_at = base + timedelta(minutes=i)
+        values = {
+            'id': i + 1, 'title': f'学术文献 {i}', 'authors': 'Zhang San; Li Si', 'abstract': f'摘要 {i}',
+            'content': '', 'file_path': f'uploads/academic/1/{i}.pdf', 'file_type': 'pdf', 'subject': '计算机科学',
+            'keywords': json.dumps(['深度学习', f'关键词{i}'], ensure_ascii=False), 'publication_year': 2023,
+            'citation_count': i % 50, 'reading_status': 'unread', 'notes': '', 'file_size': 1024 + i,
+            'upload_time': created_at, 'author_id': 1, 'folder_id': 3, 'user_category_id': None,
+            'created_at': created_at, 'updated_at': created_at,
+        }
+        rows.append(tuple(values[column] for column in RESOURCE_COLUMNS))
+    return rows
+
+def build_legacy(rows):
+    """改造前：字典游标返回的行 -> 解析 keywords -> from_dict"""
+    resources = []
+    for row in rows:
+        result = dict(zip(RESOURCE_COLUMNS, row))
+        result['keywords'] = json.loads(result['keywords']) if result.get('keywords') else []
+        resources.append(LegacyAcademicResource(**result))
+    return resources
+
+def build_current(rows):
+    """改造后：元组行直接作为记录，keywords 延迟解析"""
+    return AcademicResource.from_rows(RESOURCE_COLUMNS, rows)
+
+def measure(build, rows, runs: int):
+    """返回 (构造耗时中位数 ms, 每个对象占用的字节数)"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        build(rows)
+        timings.append(time.perf_counter() - start)
+
+    # 行数据在测量前已经存在，统计的只是构造出的对象（及其字典、解析出的关键词）新分配的内存
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    resources = build(rows)
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del resources
+    return statistics.median(timings) * 1000, allocated / len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="AcademicResource 内存与构造耗时基准")
+    parser.add_argument("-n", "--count", type=int, default=10000, help="构造的对象数")
+    parser.add_argument("-r", "--runs", type=int, default=10, help="测量次数")
+    args = parser.parse_args()
+
+    rows = make_rows(args.count)
+    print(f"{args.count} 个对象")
+    print(f"{'实现':<24}{'构造耗时中位数(ms)':>20}{'每对象内存(B)':>16}")
+    print("-" * 60)
+    results = {}
+    for name, build in (("改造前 (__dict__)", build_legacy), ("改造后 (元组记录)", build_current)):
+        results[name] = measure(build, rows, args.runs)
+        elapsed, per_object = results[name]
+        print(f"{name:<24}{elapsed:>20.2f}{per_object:>16.0f}")
+
+    (old_time, old_size), (new_time, new_size) = results.values()
+    print(f"\n构造耗时减少 {1 - new_time / old_time:.0%}，每对象内存减少 {1 - new_size / old_size:.0%}"
+          "（访问 keywords 时才解析 JSON）")
+
+if __name__ == "__main__":
+    main()
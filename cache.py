@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内查询缓存
+按名称缓存查询结果，过期时间之外再用 cache_versions 表中的版本号做跨进程失效：
+写操作在事务中把对应名称的版本号加一，各进程读取缓存时（按间隔限流）比较版本号，不一致即重新加载
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+
+def read_version(cursor, name: str) -> int:
+    """读取缓存名称的当前版本号，没有记录时为 0"""
+    cursor.execute("SELECT version FROM cache_versions WHERE name = %s", (name,))
+    row = cursor.fetchone()
+    if row is None:
+        return 0
+    return row['version'] if isinstance(row, dict) else row[0]
+
+
+def read_versions(cursor, names: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+    """一次读取多个缓存名称的 (版本号, 最后修改的 Unix 时间戳)，没有记录的名称不在结果中"""
+    names = list(names)
+    if not names:
+        return {}
+    placeholders = ", ".join(["%s"] * len(names))
+    cursor.execute(
+        f"SELECT name, version, UNIX_TIMESTAMP(updated_at) FROM cache_versions WHERE name IN ({placeholders})",
+        names
+    )
+    rows = cursor.fetchall()
+    if rows and isinstance(rows[0], dict):
+        rows = [tuple(row.values()) for row in rows]
+    return {name: (version, int(modified or 0)) for name, version, modified in rows}
+
+
+def bump_version(cursor, name: str):
+    """把缓存名称的版本号加一（在写操作的事务中调用，随事务一起提交）"""
+    cursor.execute(
+        "INSERT INTO cache_versions (name, version) VALUES (%s, 1) "
+        "ON DUPLICATE KEY UPDATE version = version + 1",
+        (name,)
+    )
+
+
+class VersionedCache:
+    """带过期时间和版本号校验的进程内缓存（线程安全）"""
+
+    def __init__(self, version_reader: Callable[[str], int], ttl: float = 300, check_interval: float = 2,
+                 max_entries: int = 1024):
+        """
+        version_reader: 读取名称当前版本号的函数
+        ttl: 缓存最长保留秒数，<= 0 表示不缓存
+        check_interval: 两次校验版本号之间的最短间隔秒数，0 表示每次读取都校验
+        max_entries: 最多保留的条目数，超出时淘汰最久未使用的条目
+        """
+        self._version_reader = version_reader
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.max_entries = max(1, max_entries)
+        # 名称 -> [版本号, 过期时间, 上次校验时间, 值]，按最近使用排序（最久未使用的在最前）
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, name: str, loader: Callable[[], Any]) -> Any:
+        """取缓存值（返回副本，调用方可以随意修改），缺失、过期或版本变化时调用 loader 重新加载"""
+        if self.ttl <= 0:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                if now < entry[1]:
+                    self._entries.move_to_end(name)
+                else:
+                    # 过期条目立即移除，不再使用的名称不会一直占用内存
+                    del self._entries[name]
+                    entry = None
+        if entry is not None:
+            if now - entry[2] < self.check_interval:
+                return self._hit(entry[3])
+            if self._version_reader(name) == entry[0]:
+                entry[2] = now
+                return self._hit(entry[3])
+
+        # 先读版本号再加载数据：加载期间发生的写入只会让缓存被标成旧版本，下次校验时重新加载
+        version = self._version_reader(name)
+        value = loader()
+        with self._lock:
+            self._misses += 1
+            self._entries[name] = [version, now + self.ttl, now, value]
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(value)
+
+    def _hit(self, value):
+        with self._lock:
+            self._hits += 1
+        return copy.deepcopy(value)
+
+    def forget(self, name: str):
+        """丢弃本进程中的缓存（写操作提交后调用，本进程立即可见）"""
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """缓存统计信息"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self._hits, 'misses': self._misses}
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 响应压缩
+按 Accept-Encoding 协商 br（安装了 brotli 时）/ gzip：普通响应整体压缩，小于阈值的不压缩；
+流式响应（导出等）逐块压缩并及时刷新；静态文件存在预压缩的 .br / .gz 文件时直接发送
+
+生成预压缩文件:
+    python compression.py [目录 ...]
+"""
+
+import gzip
+import mimetypes
+import os
+import sys
+import zlib
+from typing import Iterable, Iterator, Optional
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+from config import SITE_DIR, COMPRESS_MIN_SIZE, COMPRESS_LEVEL, COMPRESS_BROTLI_QUALITY
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# 值得压缩的内容类型（图片、压缩包等本身已压缩的类型不在其中）
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'text/xml',
+    'application/javascript', 'application/json', 'application/xml', 'application/x-ndjson',
+    'application/x-bibtex', 'image/svg+xml',
+}
+
+# 预压缩文件的 (编码, 扩展名)，按优先顺序（发送预压缩的 .br 文件不需要安装 brotli）
+PRECOMPRESSED_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+
+def accepted_encoding() -> Optional[str]:
+    """按请求的 Accept-Encoding 选择编码：权重最高者优先，权重相同时 br 优先；都不接受时返回 None"""
+    candidates = ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+def _compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """逐块压缩，每块之后刷新压缩器，客户端可以立即解压已经生成的内容"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+def compress_response(response):
+    """after_request 钩子：压缩可压缩类型的成功响应"""
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or not 200 <= response.status_code < 300 or response.status_code in (204, 206)
+            or response.direct_passthrough or 'Content-Encoding' in response.headers):
+        return response
+
+    # 同一 URL 的响应随 Accept-Encoding 不同，共享缓存需要区分
+    response.vary.add('Accept-Encoding')
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        # 替换响应体后原生成器的 close 不会再被调用，交给响应关闭时执行（导出据此关闭数据库连接）
+        original = response.response
+        if hasattr(original, 'close'):
+            response.call_on_close(original.close)
+        response.response = _compress_stream(response.iter_encoded(), encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(_compress(data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    # 编码后的字节与原始内容不同，强校验值改为弱校验值
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def send_precompressed(directory: str, filename: str):
+    """发送静态文件，客户端接受且存在不旧于原文件的 .br / .gz 文件时直接发送预压缩版本"""
+    path = safe_join(directory, filename)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if path and os.path.isfile(path):
+        for encoding, extension in PRECOMPRESSED_VARIANTS:
+            compressed_path = path + extension
+            if (request.accept_encodings[encoding] and os.path.isfile(compressed_path)
+                    and os.path.getmtime(compressed_path) >= os.path.getmtime(path)):
+                response = send_from_directory(directory, filename + extension, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                return response
+
+    response = send_from_directory(directory, filename)
+    if response.mimetype in COMPRESSIBLE_MIMETYPES:
+        response.vary.add('Accept-Encoding')
+    return response
+
+def init_compression(app):
+    """注册压缩钩子，并让静态文件路由优先发送预压缩文件"""
+    app.after_request(compress_response)
+    app.view_functions['static'] = lambda filename: send_precompressed(app.static_folder, filename)
+
+def precompress(directory: str) -> int:
+    """为目录下可压缩的静态文件生成 .gz（和 .br）文件，返回生成的文件数"""
+    count = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(('.gz', '.br')):
+                continue
+            if mimetypes.guess_type(name)[0] not in COMPRESSIBLE_MIMETYPES:
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < COMPRESS_MIN_SIZE:
+                continue
+
+            variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+            if BROTLI_AVAILABLE:
+                variants.append(('.br', brotli.compress(data, quality=11)))
+            for extension, compressed in variants:
+                # 压缩后没有变小的不保留
+                if len(compressed) < len(data):
+                    with open(path + extension, 'wb') as f:
+                        f.write(compressed)
+                    count += 1
+    return count
+
+if __name__ == "__main__":
+    directories = sys.argv[1:] or [SITE_DIR]
+    for directory in directories:
+        print(f"{directory}: 生成 {precompress(directory)} 个预压缩文件")
+    if not BROTLI_AVAILABLE:
+        print("未安装 brotli，只生成了 .gz 文件")
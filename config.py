@@ -1,7 +1,7 @@
 import os
 import time
-import logging
-import mysql.connector
+import threading
+from db_pool import ConnectionPool
 from version import get_version, get_full_version_info, print_version
 
 # 文件路径配置
@@ -13,24 +13,99 @@ START_TIME = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
 ADMIN_LOG = "admin.log"
 DEBUG_LOG = "audit.log"
 
+# 连接池配置
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "3600"))
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", "0"))
+
+# 全文检索配置：whoosh（外部索引）、fulltext（MySQL ngram 全文索引）或 like（LIKE 模糊匹配）
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "whoosh")
+# fulltext 模式下的 MATCH ... AGAINST 检索方式：boolean 或 natural
+SEARCH_FULLTEXT_MODE = os.getenv("SEARCH_FULLTEXT_MODE", "boolean")
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", os.path.join(BASE_DIR, "search_index"))
+SEARCH_MAX_HITS = int(os.getenv("SEARCH_MAX_HITS", "1000"))
+
+# 标签自动补全索引（按用户）从数据库重新加载的间隔（秒），用于获取其他进程写入的标签
+TAG_INDEX_REFRESH_SECONDS = float(os.getenv("TAG_INDEX_REFRESH_SECONDS", "300"))
+
+# 标签自动补全索引最多保留的用户数，超出时丢弃最久未使用的用户的索引
+TAG_INDEX_MAX_USERS = int(os.getenv("TAG_INDEX_MAX_USERS", "1000"))
+
+# 资源批量操作单次最多处理的资源数
+RESOURCE_BATCH_MAX_SIZE = int(os.getenv("RESOURCE_BATCH_MAX_SIZE", "500"))
+
+# 批量导入每批写入的资源数
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+# 每个进程同时进行的导出数上限（每个导出占用一个独立的数据库连接），超出时返回 503
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "4"))
+
+# 学科、分类、文件夹树进程内缓存的最长保留时间（秒），0 表示不缓存
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+
+# 进程内缓存两次校验 cache_versions 版本号的最短间隔（秒），即其他进程写入后最长的可见延迟
+CACHE_VERSION_CHECK_SECONDS = float(os.getenv("CACHE_VERSION_CHECK_SECONDS", "2"))
+
+# 进程内缓存最多保留的条目数（按用户的文件夹、分类各占一条），超出时淘汰最久未使用的条目
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+# 响应压缩：小于该字节数的响应不压缩
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+
+# 响应压缩级别：gzip 为 1-9，brotli 为 0-11（动态响应用中等级别，预压缩静态文件用最高级别）
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
+# 上传文件的内容寻址存储目录（按 SHA-256 分两级子目录，不在 static 下，只能通过下载/预览接口访问）
+FILE_STORAGE_DIR = os.getenv("FILE_STORAGE_DIR", os.path.join(BASE_DIR, "uploads", "objects"))
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
 # 数据库连接配置
-def get_db_connection():
-    """获取数据库连接"""
+def connect_db():
+    """创建一个新的（非池化）数据库连接"""
+    # 延迟导入驱动，只导入 config 的工具脚本不需要加载它
+    import mysql.connector
+    from mysql.connector.constants import ClientFlag
     return mysql.connector.connect(
         host=os.getenv("DB_HOST", "127.0.0.1"),
         port=int(os.getenv("DB_PORT", "3307")),
         user=os.getenv("DB_USER", "root"),
         password=os.getenv("DB_PASSWORD", ""),
-        database=os.getenv("DB_NAME", "mysite")
+        database=os.getenv("DB_NAME", "mysite"),
+        # 读操作无需事务；写操作通过 database.transaction() 显式开启事务
+        autocommit=True,
+        # UPDATE 的 rowcount 返回匹配的行数而不是实际改变的行数，
+        # 按归属条件更新时才能区分"无权限/不存在"和"值未变化"
+        client_flags=[ClientFlag.FOUND_ROWS]
     )
 
-# 初始化数据库连接和游标
-db = get_db_connection()
-cursor = db.cursor(dictionary=True)
+def get_db_pool():
+    """获取全局连接池（首次调用时创建）"""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ConnectionPool(
+                    connect_db,
+                    size=DB_POOL_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    recycle=DB_POOL_RECYCLE,
+                    ping_interval=DB_POOL_PING_INTERVAL
+                )
+    return _db_pool
+
+def get_db_connection():
+    """获取数据库连接（从连接池借出，close() 即归还）"""
+    return get_db_pool().connection()
 
 # 日志配置函数
 def setup_logging():
     """设置日志配置"""
+    import logging
+
     # 每次启动都清空管理员日志
     open(ADMIN_LOG, "w").close()
     
@@ -52,9 +127,26 @@ def setup_logging():
     
     return audit_logger, admin_logger
 
-# 初始化日志记录器
-audit_logger, admin_logger = setup_logging()
+_loggers = None
+_loggers_lock = threading.Lock()
+
+def get_loggers():
+    """获取 (audit_logger, admin_logger)，首次调用时初始化日志"""
+    global _loggers
+    if _loggers is None:
+        with _loggers_lock:
+            if _loggers is None:
+                _loggers = setup_logging()
+    return _loggers
 
-# 版本信息
-VERSION = get_version()
-VERSION_INFO = get_full_version_info()
\ No newline at end of file
+def __getattr__(name):
+    """延迟创建的模块属性：日志记录器和版本信息在首次访问时才初始化"""
+    if name == "audit_logger":
+        return get_loggers()[0]
+    if name == "admin_logger":
+        return get_loggers()[1]
+    if name == "VERSION":
+        return get_version()
+    if name == "VERSION_INFO":
+        return get_full_version_info()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
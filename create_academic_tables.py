@@ -8,6 +8,7 @@
 import os
 import mysql.connector
 from config import get_db_connection
+from modules.academic.migrations import run_migrations
 
 def create_academic_tables():
     """创建学术资源库相关的数据库表"""
@@ -184,6 +185,10 @@ if __name__ == "__main__":
         # 创建数据库表
         create_academic_tables()
         
+        # 执行索引等增量迁移
+        print("\n正在执行数据库迁移...")
+        run_migrations()
+        
         # 创建上传目录
         print("\n正在创建文件上传目录...")
         create_upload_directories()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库访问辅助
+- 请求级连接：每个请求首次使用时从连接池借出，请求结束时（teardown_request）归还
+- 工作单元：transaction() 在一个连接上执行多条语句并统一提交一次
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from flask import g
+from config import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# 当前线程正在进行的工作单元
+_local = threading.local()
+
+def get_db():
+    """获取当前请求的数据库连接（首次使用时从连接池借出）"""
+    if 'db' not in g:
+        g.db = get_db_connection()
+    return g.db
+
+def get_cursor(dictionary: bool = True):
+    """在当前请求的连接上创建游标（缓冲结果，同一连接上可连续执行多条语句）"""
+    return get_db().cursor(dictionary=dictionary, buffered=True)
+
+def close_db(exc=None):
+    """归还当前请求的连接，未提交的事务会在归还时回滚"""
+    db = g.pop('db', None)
+    if db is not None:
+        db.close()
+
+class UnitOfWork:
+    """工作单元：持有一个连接，其上创建的游标在结束时统一关闭"""
+
+    def __init__(self, connection, in_transaction: bool):
+        self.connection = connection
+        self.in_transaction = in_transaction
+        self._cursors = []
+        self._after_commit = []
+        self._on_rollback = []
+        # 可选的游标包装函数（如执行计划检查工具记录语句），默认不包装
+        self.cursor_wrapper = None
+
+    def cursor(self, dictionary: bool = False):
+        """创建游标（缓冲结果，同一连接上的多个游标可交替使用）"""
+        cursor = self.connection.cursor(dictionary=dictionary, buffered=True)
+        self._cursors.append(cursor)
+        if self.cursor_wrapper is not None:
+            return self.cursor_wrapper(cursor)
+        return cursor
+
+    def on_commit(self, callback):
+        """注册提交成功后执行的回调（如删除物理文件），回滚时不执行"""
+        if self.in_transaction:
+            self._after_commit.append(callback)
+        else:
+            callback()
+
+    def on_rollback(self, callback):
+        """注册回滚时执行的回调（如删除本事务写入的物理文件），在回滚之前执行，此时仍持有本事务的行锁"""
+        if self.in_transaction:
+            self._on_rollback.append(callback)
+
+    def _close_cursors(self):
+        for cursor in self._cursors:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._cursors.clear()
+
+    def _run_after_commit(self):
+        for callback in self._after_commit:
+            try:
+                callback()
+            except Exception:
+                logger.exception("提交后回调执行失败")
+        self._after_commit.clear()
+
+    def _run_on_rollback(self):
+        for callback in self._on_rollback:
+            try:
+                callback()
+            except Exception:
+                logger.exception("回滚回调执行失败")
+        self._on_rollback.clear()
+
+def current_unit_of_work():
+    """获取当前线程正在进行的工作单元，没有则返回 None"""
+    return getattr(_local, 'unit_of_work', None)
+
+@contextmanager
+def transaction():
+    """
+    开启事务型工作单元
+    嵌套调用会加入外层事务，只在最外层提交一次；异常时整体回滚
+    """
+    current = current_unit_of_work()
+    if current is not None and current.in_transaction:
+        yield current
+        return
+
+    db = get_db_connection()
+    uow = UnitOfWork(db, in_transaction=True)
+    _local.unit_of_work = uow
+    try:
+        db.start_transaction()
+        yield uow
+        uow._close_cursors()
+        db.commit()
+    except Exception:
+        uow._close_cursors()
+        uow._run_on_rollback()
+        db.rollback()
+        raise
+    finally:
+        _local.unit_of_work = current
+        db.close()
+
+    uow._run_after_commit()
+
+@contextmanager
+def read_session():
+    """
+    开启只读工作单元
+    存在当前事务时复用事务连接（可读到未提交的写入），否则借出一个自动提交连接
+    """
+    current = current_unit_of_work()
+    if current is not None:
+        yield current
+        return
+
+    db = get_db_connection()
+    uow = UnitOfWork(db, in_transaction=False)
+    _local.unit_of_work = uow
+    try:
+        yield uow
+    finally:
+        _local.unit_of_work = current
+        uow._close_cursors()
+        db.close()
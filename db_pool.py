@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接池
+有界、线程安全的MySQL连接池，支持借出超时、借出时健康检查和连接定期回收
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+
+class PoolTimeout(Exception):
+    """在超时时间内没有借到连接"""
+
+
+class PooledConnection:
+    """池化连接包装，close() 时归还连接池而不是真正断开"""
+
+    def __init__(self, pool: 'ConnectionPool', raw, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released_at = time.monotonic()
+        self._closed = False
+
+    def __getattr__(self, name):
+        # 其余属性和方法（cursor、commit、rollback 等）直接转发给底层连接
+        return getattr(self._raw, name)
+
+    def close(self):
+        """归还连接到连接池（重复调用无副作用）"""
+        if self._closed:
+            return
+        self._closed = True
+        self._pool._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """有界线程安全连接池"""
+
+    def __init__(self, connect: Callable, size: int = 10, timeout: float = 5.0,
+                 recycle: float = 3600, ping_interval: float = 0):
+        """
+        connect: 创建底层连接的函数
+        size: 最大连接数（借出 + 空闲）
+        timeout: 借出连接的最长等待秒数
+        recycle: 连接存活超过该秒数后关闭重建，<= 0 表示不回收
+        ping_interval: 空闲超过该秒数的连接借出前先 ping 检查，0 表示每次都检查
+        """
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+
+        self._idle = deque()
+        self._total = 0
+        self._in_use = 0
+        self._cond = threading.Condition(threading.Lock())
+
+        # 统计信息
+        self._created = 0
+        self._recycled = 0
+        self._broken = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+
+    def connection(self) -> PooledConnection:
+        """借出一个可用连接，超时抛出 PoolTimeout"""
+        deadline = None
+        waited_since = None
+
+        with self._cond:
+            while not self._idle and self._total >= self.size:
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + self.timeout
+                    waited_since = now
+                    self._waits += 1
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._timeouts += 1
+                    self._record_wait(waited_since)
+                    raise PoolTimeout(f"{self.timeout}秒内未能获取数据库连接（连接池大小 {self.size}）")
+                self._cond.wait(remaining)
+
+            if waited_since is not None:
+                self._record_wait(waited_since)
+                waited_since = None
+
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = None
+                self._total += 1
+            self._in_use += 1
+            self._checkouts += 1
+
+        # 建连和健康检查都在锁外进行，避免阻塞其他线程
+        if conn is None:
+            try:
+                return self._new_connection()
+            except Exception:
+                self._discard()
+                raise
+
+        if self._is_expired(conn) or not self._is_healthy(conn):
+            self._close_raw(conn)
+            try:
+                return self._new_connection()
+            except Exception:
+                self._discard()
+                raise
+
+        # 每次借出都换一个新的包装对象，旧引用上的 close() 不会误还别人的连接
+        return PooledConnection(self, conn._raw, conn._created_at)
+
+    def _new_connection(self) -> PooledConnection:
+        raw = self._connect()
+        with self._cond:
+            self._created += 1
+        return PooledConnection(self, raw, time.monotonic())
+
+    def _record_wait(self, since: float):
+        waited = time.monotonic() - since
+        self._wait_time += waited
+        self._max_wait = max(self._max_wait, waited)
+
+    def _is_expired(self, conn: PooledConnection) -> bool:
+        if self.recycle > 0 and time.monotonic() - conn._created_at > self.recycle:
+            with self._cond:
+                self._recycled += 1
+            return True
+        return False
+
+    def _is_healthy(self, conn: PooledConnection) -> bool:
+        if time.monotonic() - conn._released_at < self.ping_interval:
+            return True
+        try:
+            conn._raw.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._cond:
+                self._broken += 1
+            return False
+
+    @staticmethod
+    def _close_raw(conn: PooledConnection):
+        try:
+            conn._raw.close()
+        except Exception:
+            pass
+
+    def _discard(self):
+        """放弃一个已计数的连接名额"""
+        with self._cond:
+            self._total -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _release(self, conn: PooledConnection):
+        """归还连接：清理未读结果并回滚未提交事务，失败则丢弃连接"""
+        try:
+            raw = conn._raw
+            if raw.unread_result:
+                raw.consume_results()
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            self._close_raw(conn)
+            with self._cond:
+                self._broken += 1
+            self._discard()
+            return
+
+        if self._is_expired(conn):
+            self._close_raw(conn)
+            self._discard()
+            return
+
+        conn._released_at = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def dispose(self):
+        """关闭所有空闲连接（借出中的连接归还时照常入池）"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_raw(conn)
+
+    def stats(self) -> Dict:
+        """连接池统计信息"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'created': self._created,
+                'recycled': self._recycled,
+                'broken': self._broken,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_ms': int(self._wait_time * 1000),
+                'max_wait_ms': int(self._max_wait * 1000),
+                'timeouts': self._timeouts
+            }
@@ -1,7 +1,7 @@
 from flask import Blueprint, jsonify, request
 import os
 import time
-from config import ADMIN_LOG, DEBUG_LOG, START_TIME, VERSION_INFO
+from config import ADMIN_LOG, DEBUG_LOG, START_TIME, get_full_version_info, get_db_pool
 
 # 创建日志蓝图
 logs_bp = Blueprint('logs', __name__)
@@ -40,13 +40,15 @@ def get_status():
     if not check_admin_auth():
         return jsonify({"error": "无权限访问服务器状态"}), 403
         
+    version_info = get_full_version_info()
     status_info = {
         "server": "mysite",
         "status": "running",
         "start_time": START_TIME,
         "uptime_seconds": int(time.time() - time.mktime(time.strptime(START_TIME, "%Y-%m-%d %H:%M:%S"))),
-        "version": VERSION_INFO['version'],
-        "build_date": VERSION_INFO['build_date'],
-        "description": VERSION_INFO['description']
+        "version": version_info['version'],
+        "build_date": version_info['build_date'],
+        "description": version_info['description'],
+        "db_pool": get_db_pool().stats()
     }
     return jsonify(status_info)
\ No newline at end of file
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学术资源流式导出
+在专用的非池化连接上用非缓冲游标逐批读取（结果不在客户端缓存），边读边格式化为
+JSON Lines / CSV / BibTeX 文本块，内存占用与导出的资源总数无关；
+导出耗时取决于客户端下载速度，不占用连接池名额，客户端中途断开时直接断开连接而不读完剩余结果
+"""
+
+import csv
+import io
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List
+from config import connect_db, EXPORT_MAX_CONCURRENT
+from modules.academic.models import AcademicResourceManager
+from modules.academic import search as search_index
+
+logger = logging.getLogger(__name__)
+
+class ExportBusy(Exception):
+    """同时进行的导出数已达上限"""
+
+# 导出名额：每个导出从开始查询到生成器关闭占用一个名额，防止导出耗尽 MySQL 的 max_connections
+_export_slots = threading.BoundedSemaphore(max(1, EXPORT_MAX_CONCURRENT))
+
+# 每次从服务器读取的行数
+EXPORT_FETCH_SIZE = 500
+
+# 导出的列（不含文件路径等服务器内部信息）
+EXPORT_COLUMNS = (
+    'id', 'title', 'authors', 'abstract', 'content', 'subject', 'keywords', 'publication_year',
+    'citation_count', 'reading_status', 'notes', 'file_type', 'folder_id', 'user_category_id',
+    'created_at', 'updated_at'
+)
+
+# 标签名之间的分隔符（不会出现在标签名中的控制字符）
+_TAG_SEPARATOR = "\x1f"
+
+# 导出格式：(MIME 类型, 文件扩展名)
+EXPORT_FORMATS = {
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+    'bibtex': ('application/x-bibtex', 'bib'),
+}
+
+def _normalize_row(row: Dict) -> Dict:
+    """解析关键词 JSON 和拼接的标签名"""
+    keywords = row.get('keywords')
+    row['keywords'] = json.loads(keywords) if keywords else []
+    tag_names = row.pop('tag_names', None)
+    row['tags'] = tag_names.split(_TAG_SEPARATOR) if tag_names else []
+    return row
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _format_jsonl(rows: List[Dict], first: bool) -> str:
+    return ''.join(json.dumps(row, ensure_ascii=False, default=_json_default) + '\n' for row in rows)
+
+def _format_csv(rows: List[Dict], first: bool) -> str:
+    columns = EXPORT_COLUMNS + ('tags',)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if first:
+        writer.writerow(columns)
+    for row in rows:
+        values = []
+        for column in columns:
+            value = row.get(column)
+            if isinstance(value, list):
+                value = '; '.join(str(item) for item in value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            values.append('' if value is None else value)
+        writer.writerow(values)
+    return buffer.getvalue()
+
+# BibTeX 值中需要转义的字符
+_BIBTEX_ESCAPES = str.maketrans({
+    '\\': r'\textbackslash{}', '{': r'\{', '}': r'\}',
+    '&': r'\&', '%': r'\%', '_': r'\_', '#': r'\#', '$': r'\$',
+})
+
+def _bibtex_escape(value) -> str:
+    return str(value).translate(_BIBTEX_ESCAPES)
+
+def _format_bibtex(rows: List[Dict], first: bool) -> str:
+    entries = []
+    for row in rows:
+        fields = [
+            ('title', row.get('title')),
+            ('author', ' and '.join(name.strip() for name in (row.get('authors') or '').split(';') if name.strip())),
+            ('year', row.get('publication_year')),
+            ('abstract', row.get('abstract')),
+            ('keywords', ', '.join(row['keywords'] + row['tags'])),
+            ('note', row.get('notes')),
+        ]
+        body = ',\n'.join(f"  {name} = {{{_bibtex_escape(value)}}}" for name, value in fields if value)
+        entries.append(f"@misc{{resource{row['id']},\n{body}\n}}\n\n")
+    return ''.join(entries)
+
+_FORMATTERS: Dict[str, Callable[[List[Dict], bool], str]] = {
+    'jsonl': _format_jsonl,
+    'csv': _format_csv,
+    'bibtex': _format_bibtex,
+}
+
+def _abort_connection(db):
+    """不读取未读结果直接断开连接（close() 会先读完未读结果），失败时退回 close()"""
+    try:
+        db.shutdown()
+        return
+    except Exception:
+        logger.exception("导出连接断开失败，改为正常关闭")
+    try:
+        db.close()
+    except Exception:
+        logger.exception("导出连接关闭失败")
+
+def stream_export(user_id: int, fmt: str, folder_id: int = None, category_id: int = None,
+                  status: str = None, search: str = None, search_mode: str = None,
+                  include_descendants: bool = False, tags: List[str] = None,
+                  tag_mode: str = 'and') -> Iterator[str]:
+    """
+    开始导出并返回逐块产出文本的生成器，筛选条件与资源列表相同（见 _build_filters）；
+    全文索引可用时 search 与资源列表一样由索引匹配（导出全部匹配的资源，不受 SEARCH_MAX_HITS 限制）
+    查询在调用时即执行，出错会直接抛出；同时进行的导出数达到 EXPORT_MAX_CONCURRENT 时抛出 ExportBusy；
+    生成器结束或被关闭时关闭连接并归还名额
+    """
+    if fmt not in _FORMATTERS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    formatter = _FORMATTERS[fmt]
+
+    matched_ids = None
+    if search and search_index.is_ready():
+        matched_ids, _ = search_index.search_ids(user_id, search, limit=None)
+        search = None
+    where_conditions, params = AcademicResourceManager._build_filters(
+        user_id, folder_id, category_id, status, search, search_mode,
+        include_descendants=include_descendants, tags=tags, tag_mode=tag_mode)
+    if matched_ids is not None:
+        if matched_ids:
+            where_conditions.append(f"id IN ({', '.join(['%s'] * len(matched_ids))})")
+            params.extend(matched_ids)
+        else:
+            where_conditions.append("1 = 0")
+    # 非缓冲游标读取结果时同一连接上不能再执行其他查询，标签用相关子查询随行返回
+    sql = f"""
+    SELECT {', '.join(EXPORT_COLUMNS)},
+        (SELECT GROUP_CONCAT(t.name ORDER BY t.name SEPARATOR '{_TAG_SEPARATOR}')
+         FROM academic_resource_tags rt JOIN tags t ON t.id = rt.tag_id
+         WHERE rt.resource_id = academic_resources.id) AS tag_names
+    FROM academic_resources
+    WHERE {' AND '.join(where_conditions)}
+    ORDER BY created_at DESC, id DESC
+    """
+
+    if not _export_slots.acquire(blocking=False):
+        raise ExportBusy(f"同时进行的导出数已达上限（{EXPORT_MAX_CONCURRENT}），请稍后重试")
+    try:
+        db = connect_db()
+    except Exception:
+        _export_slots.release()
+        raise
+    try:
+        setup = db.cursor()
+        setup.execute("SET SESSION group_concat_max_len = 65535")
+        setup.close()
+        cursor = db.cursor(dictionary=True)
+        cursor.execute(sql, params)
+    except Exception:
+        _abort_connection(db)
+        _export_slots.release()
+        raise
+
+    def generate():
+        finished = False
+        try:
+            # 先启动到这里再交给调用方：之后即使一次都没有读取，关闭生成器（或被回收）也会执行 finally
+            yield ''
+            first = True
+            while True:
+                rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+                if not rows:
+                    if first and fmt == 'csv':
+                        yield formatter([], True)
+                    break
+                yield formatter([_normalize_row(row) for row in rows], first)
+                first = False
+            finished = True
+        finally:
+            try:
+                if finished:
+                    cursor.close()
+                    db.close()
+                else:
+                    # 客户端中途断开或读取出错：剩余结果可能还有很多行，直接断开连接，不逐行读完
+                    _abort_connection(db)
+            finally:
+                _export_slots.release()
+
+    chunks = generate()
+    next(chunks)
+    return chunks
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学术资源批量导入
+流式解析 BibTeX / RIS / CSV（逐条读取，不把整个文件读入内存），按批多行写入 academic_resources，
+每批一个事务；某一批失败只记录错误并继续导入后面的批次
+
+用法:
+    python -m modules.academic.importers 文件 --user 用户ID [--format bibtex|ris|csv]
+                                         [--batch-size 500] [--folder 文件夹ID] [--tag 标签 ...]
+"""
+
+import csv
+import os
+import re
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from config import IMPORT_BATCH_SIZE
+from database import read_session
+from modules.academic.models import AcademicResourceManager, READING_STATUSES
+
+# 支持的格式及对应的文件扩展名
+IMPORT_FORMATS = {'bibtex': ('.bib', '.bibtex'), 'ris': ('.ris',), 'csv': ('.csv',)}
+
+# 导入报告中最多保留的错误条数
+MAX_REPORTED_ERRORS = 100
+
+# 不是文献条目的 BibTeX 块
+_BIBTEX_SKIPPED_TYPES = {'comment', 'string', 'preamble'}
+_BIBTEX_HEAD_RE = re.compile(r"@\s*(\w+)\s*[{(]\s*([^,\s]*)\s*,?", re.S)
+_BIBTEX_NAME_RE = re.compile(r"[\w\-:.]+")
+_BIBTEX_BARE_RE = re.compile(r"[^,#}\s]+")
+_BIBTEX_AND_RE = re.compile(r"\s+and\s+")
+_RIS_LINE_RE = re.compile(r"^([A-Z][A-Z0-9])  -(?: (.*))?$")
+_YEAR_RE = re.compile(r"\d{4}")
+_LIST_SPLIT_RE = re.compile(r"\s*[;,]\s*")
+
+def detect_format(filename: str) -> Optional[str]:
+    """按扩展名判断导入格式，无法识别时返回 None"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    for name, extensions in IMPORT_FORMATS.items():
+        if extension in extensions:
+            return name
+    return None
+
+def _split_list(value: str) -> List[str]:
+    return [item for item in _LIST_SPLIT_RE.split(value or '') if item]
+
+def _clean_bibtex_value(value: str) -> str:
+    """去掉 BibTeX 值中的分组花括号和常见转义，合并空白"""
+    value = value.replace('\\&', '&').replace('\\%', '%').replace('\\_', '_')
+    value = value.replace('{', '').replace('}', '')
+    return ' '.join(value.split())
+
+def _read_bibtex_value(text: str, pos: int):
+    """从 pos 读取一个字段值（{...}、"..." 或裸值，支持 # 连接），返回 (值, 结束位置)"""
+    parts = []
+    length = len(text)
+    while True:
+        while pos < length and text[pos].isspace():
+            pos += 1
+        if pos >= length:
+            break
+        if text[pos] == '{':
+            depth = 0
+            start = pos + 1
+            while pos < length:
+                if text[pos] == '{':
+                    depth += 1
+                elif text[pos] == '}':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                pos += 1
+            if depth != 0:
+                raise ValueError("花括号不匹配")
+            parts.append(text[start:pos])
+            pos += 1
+        elif text[pos] == '"':
+            depth = 0
+            start = pos + 1
+            pos += 1
+            while pos < length and not (text[pos] == '"' and depth == 0 and text[pos - 1] != '\\'):
+                if text[pos] == '{':
+                    depth += 1
+                elif text[pos] == '}':
+                    depth -= 1
+                pos += 1
+            if pos >= length:
+                raise ValueError("引号不匹配")
+            parts.append(text[start:pos])
+            pos += 1
+        else:
+            match = _BIBTEX_BARE_RE.match(text, pos)
+            if not match:
+                break
+            parts.append(match.group())
+            pos = match.end()
+
+        while pos < length and text[pos].isspace():
+            pos += 1
+        if pos < length and text[pos] == '#':
+            pos += 1
+            continue
+        break
+    return _clean_bibtex_value(''.join(parts)), pos
+
+def _parse_bibtex_entry(text: str) -> Optional[Dict[str, str]]:
+    """解析一个完整的 BibTeX 条目，返回 {字段名(小写): 值}，非文献块返回 None"""
+    head = _BIBTEX_HEAD_RE.match(text)
+    if not head:
+        raise ValueError("无法识别的 BibTeX 条目")
+    if head.group(1).lower() in _BIBTEX_SKIPPED_TYPES:
+        return None
+
+    fields = {'_type': head.group(1).lower(), '_key': head.group(2)}
+    pos = head.end()
+    length = len(text)
+    while pos < length:
+        while pos < length and (text[pos].isspace() or text[pos] == ','):
+            pos += 1
+        if pos >= length or text[pos] in '})':
+            break
+        name = _BIBTEX_NAME_RE.match(text, pos)
+        if not name:
+            raise ValueError(f"第 {pos} 个字符处无法解析字段名")
+        pos = name.end()
+        while pos < length and text[pos].isspace():
+            pos += 1
+        if pos >= length or text[pos] != '=':
+            raise ValueError(f"字段 {name.group()} 缺少 =")
+        value, pos = _read_bibtex_value(text, pos + 1)
+        fields[name.group().lower()] = value
+    return fields
+
+def _iter_bibtex_blocks(lines: Iterable[str]) -> Iterator[str]:
+    """
+    按定界符配对切分出一个个 @ 块，只缓存当前块；花括号未闭合时遇到行首的 @ 即重新同步
+    只有开启条目的那一种定界符（@type{ 的花括号或 @type( 的圆括号）能结束条目，
+    值中的圆括号和条目层级上引号值内的定界符不参与配对
+    """
+    buffer = []
+    opener = None       # 开启条目的定界符，None 表示还在读条目类型
+    depth = 0           # 花括号嵌套层数（花括号条目包含开启的那一层）
+    in_quote = False
+    prev = ''
+    in_block = False
+    for line in lines:
+        if in_block and line.lstrip().startswith('@'):
+            yield ''.join(buffer)
+            in_block = False
+        pos = 0
+        while pos < len(line):
+            if not in_block:
+                at = line.find('@', pos)
+                if at < 0:
+                    break
+                in_block, opener, depth, in_quote, prev, buffer = True, None, 0, False, '', []
+                pos = at
+            end = None
+            for i in range(pos, len(line)):
+                ch = line[i]
+                if opener is None:
+                    if ch in '{(':
+                        opener = ch
+                        depth = 1 if ch == '{' else 0
+                elif ch == '{':
+                    depth += 1
+                elif ch == '}':
+                    depth -= 1
+                    if opener == '{' and depth == 0 and not in_quote:
+                        end = i + 1
+                        break
+                elif ch == '"' and prev != '\\' and depth == (1 if opener == '{' else 0):
+                    in_quote = not in_quote
+                elif ch == ')' and opener == '(' and depth == 0 and not in_quote:
+                    end = i + 1
+                    break
+                prev = ch
+            if end is None:
+                buffer.append(line[pos:])
+                break
+            buffer.append(line[pos:end])
+            yield ''.join(buffer)
+            in_block = False
+            pos = end
+    if in_block and buffer:
+        yield ''.join(buffer)
+
+def parse_bibtex(lines: Iterable[str]) -> Iterator[Dict]:
+    """流式解析 BibTeX，逐条产出导入记录（解析失败的条目产出 {'_error': 原因}）"""
+    for block in _iter_bibtex_blocks(lines):
+        try:
+            fields = _parse_bibtex_entry(block)
+        except ValueError as e:
+            yield {'_error': f"BibTeX 解析失败: {e}"}
+            continue
+        if fields is None:
+            continue
+        yield {
+            'title': fields.get('title'),
+            'authors': '; '.join(name for name in _BIBTEX_AND_RE.split(fields.get('author', '')) if name),
+            'abstract': fields.get('abstract'),
+            'keywords': _split_list(fields.get('keywords', '')),
+            'publication_year': fields.get('year'),
+            'notes': fields.get('note') or fields.get('annote'),
+        }
+
+def parse_ris(lines: Iterable[str]) -> Iterator[Dict]:
+    """流式解析 RIS：TY 开始一条记录，ER 结束"""
+    record = None
+    for line in lines:
+        match = _RIS_LINE_RE.match(line.rstrip('\r\n'))
+        if not match:
+            continue
+        tag, value = match.group(1), (match.group(2) or '').strip()
+        if tag == 'TY':
+            record = {'authors': [], 'keywords': []}
+            continue
+        if record is None:
+            continue
+        if tag == 'ER':
+            yield {
+                'title': record.get('title'),
+                'authors': '; '.join(record['authors']),
+                'abstract': record.get('abstract'),
+                'keywords': record['keywords'],
+                'publication_year': record.get('year'),
+                'notes': record.get('notes'),
+            }
+            record = None
+        elif tag in ('TI', 'T1'):
+            record.setdefault('title', value)
+        elif tag in ('AU', 'A1'):
+            record['authors'].append(value)
+        elif tag in ('AB', 'N2'):
+            record.setdefault('abstract', value)
+        elif tag == 'KW':
+            record['keywords'].append(value)
+        elif tag in ('PY', 'Y1', 'DA'):
+            record.setdefault('year', value)
+        elif tag == 'N1':
+            record.setdefault('notes', value)
+
+def parse_csv(lines: Iterable[str]) -> Iterator[Dict]:
+    """流式解析 CSV，首行为表头，列名不区分大小写（year 与 publication_year、author 与 authors 等同）"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+        yield {
+            'title': row.get('title'),
+            'authors': row.get('authors') or row.get('author'),
+            'abstract': row.get('abstract'),
+            'keywords': _split_list(row.get('keywords', '')),
+            'publication_year': row.get('publication_year') or row.get('year'),
+            'subject': row.get('subject'),
+            'reading_status': row.get('reading_status'),
+            'notes': row.get('notes'),
+            'tags': _split_list(row.get('tags', '')),
+        }
+
+PARSERS: Dict[str, Callable[[Iterable[str]], Iterator[Dict]]] = {
+    'bibtex': parse_bibtex,
+    'ris': parse_ris,
+    'csv': parse_csv,
+}
+
+def _to_resource(record: Dict, user_id: int, folder_id: Optional[int], tags: List[str]) -> Dict:
+    """把解析出的记录转换为资源数据，缺少标题时抛出 ValueError"""
+    title = (record.get('title') or '').strip()
+    if not title:
+        raise ValueError("缺少标题")
+
+    year = _YEAR_RE.search(str(record.get('publication_year') or ''))
+    status = record.get('reading_status')
+    return {
+        'title': title[:300],
+        'authors': record.get('authors') or None,
+        'abstract': record.get('abstract') or None,
+        'subject': (record.get('subject') or '')[:100] or None,
+        'keywords': record.get('keywords') or [],
+        'publication_year': int(year.group()) if year else None,
+        'reading_status': status if status in READING_STATUSES else 'unread',
+        'notes': record.get('notes') or None,
+        'file_type': 'note',
+        'author_id': user_id,
+        'folder_id': folder_id,
+        'tags': list(tags) + list(record.get('tags') or []),
+    }
+
+def import_resources(user_id: int, lines: Iterable[str], fmt: str,
+                     batch_size: int = IMPORT_BATCH_SIZE, folder_id: int = None,
+                     tags: List[str] = None,
+                     on_progress: Callable[[Dict], None] = None) -> Dict:
+    """
+    导入资源，返回报告 {total, imported, skipped, failed, batches, errors}
+    每批在一个事务中写入，失败的批次整体跳过并记录错误；on_progress 在每批结束后以当前报告调用
+    """
+    if fmt not in PARSERS:
+        raise ValueError(f"不支持的导入格式: {fmt}")
+    batch_size = max(1, batch_size)
+
+    if folder_id is not None:
+        with read_session() as session:
+            cursor = session.cursor()
+            cursor.execute("SELECT 1 FROM academic_folders WHERE id = %s AND user_id = %s", (folder_id, user_id))
+            if cursor.fetchone() is None:
+                raise ValueError("目标文件夹不存在或无权限")
+
+    report = {'total': 0, 'imported': 0, 'skipped': 0, 'failed': 0, 'batches': 0, 'errors': []}
+
+    def add_error(entry: Optional[int], message: str):
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'entry': entry, 'message': message})
+
+    records = enumerate(PARSERS[fmt](lines), start=1)
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+        report['batches'] += 1
+        report['total'] += len(chunk)
+
+        batch = []
+        for number, record in chunk:
+            if '_error' in record:
+                report['skipped'] += 1
+                add_error(number, record['_error'])
+                continue
+            try:
+                batch.append(_to_resource(record, user_id, folder_id, tags or []))
+            except ValueError as e:
+                report['skipped'] += 1
+                add_error(number, str(e))
+
+        if batch:
+            try:
+                AcademicResourceManager.create_resources(batch)
+                report['imported'] += len(batch)
+            except Exception as e:
+                report['failed'] += len(batch)
+                add_error(None, f"第 {chunk[0][0]}-{chunk[-1][0]} 条所在批次写入失败: {e}")
+
+        if on_progress:
+            on_progress(report)
+    return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="批量导入学术资源")
+    parser.add_argument("file", help="BibTeX / RIS / CSV 文件")
+    parser.add_argument("--user", type=int, required=True, help="导入到该用户名下")
+    parser.add_argument("--format", choices=sorted(PARSERS), help="文件格式，默认按扩展名判断")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="每批写入的条数")
+    parser.add_argument("--folder", type=int, help="导入到指定文件夹")
+    parser.add_argument("--tag", action="append", default=[], help="为所有导入的资源添加标签（可重复）")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.file)
+    if not fmt:
+        print("❌ 无法根据扩展名判断文件格式，请使用 --format 指定")
+        raise SystemExit(1)
+
+    def print_progress(report):
+        print(f"… 第 {report['batches']} 批完成：已读取 {report['total']} 条，"
+              f"导入 {report['imported']}，跳过 {report['skipped']}，失败 {report['failed']}")
+
+    with open(args.file, encoding="utf-8-sig", newline="") as f:
+        result = import_resources(args.user, f, fmt, args.batch_size, args.folder, args.tag, print_progress)
+
+    for error in result['errors']:
+        prefix = f"第 {error['entry']} 条: " if error['entry'] else ""
+        print(f"⚠ {prefix}{error['message']}")
+    print(f"✓ 导入完成，共 {result['total']} 条：导入 {result['imported']}，"
+          f"跳过 {result['skipped']}，失败 {result['failed']}")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学术资源库数据库迁移
+迁移按版本号顺序执行，已执行的版本记录在 schema_migrations 表中；
+每个迁移自身也是幂等的（先检查再变更），重复执行不会出错
+
+用法:
+    python -m modules.academic.migrations
+"""
+
+from typing import Callable, List, Tuple
+from config import get_db_connection
+
+# 已注册的迁移：(版本号, 说明, 执行函数)
+MIGRATIONS: List[Tuple[int, str, Callable]] = []
+
+def migration(version: int, description: str):
+    """注册迁移的装饰器"""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return decorator
+
+def index_exists(cursor, table: str, index_name: str) -> bool:
+    """检查当前库中表上是否已有指定名称的索引"""
+    cursor.execute(
+        "SELECT 1 FROM information_schema.STATISTICS "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+        (table, index_name)
+    )
+    return cursor.fetchone() is not None
+
+def add_index(cursor, table: str, index_name: str, columns: str, kind: str = "", options: str = ""):
+    """索引不存在时才创建，kind 可为 UNIQUE / FULLTEXT，options 如 WITH PARSER ngram"""
+    if index_exists(cursor, table, index_name):
+        return
+    kind_sql = f"{kind} " if kind else ""
+    options_sql = f" {options}" if options else ""
+    cursor.execute(f"ALTER TABLE {table} ADD {kind_sql}INDEX {index_name} ({columns}){options_sql}")
+
+def column_exists(cursor, table: str, column: str) -> bool:
+    """检查当前库中表上是否已有指定列"""
+    cursor.execute(
+        "SELECT 1 FROM information_schema.COLUMNS "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s LIMIT 1",
+        (table, column)
+    )
+    return cursor.fetchone() is not None
+
+def add_column(cursor, table: str, column: str, definition: str):
+    """列不存在时才添加"""
+    if column_exists(cursor, table, column):
+        return
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+@migration(1, "资源列表 keyset 分页索引 academic_resources(author_id, created_at, id)")
+def _resources_author_created(cursor):
+    add_index(cursor, "academic_resources", "idx_resources_author_created", "author_id, created_at, id")
+
+@migration(2, "资源标题/作者/摘要 ngram 全文索引（MySQL 5.7.6+）")
+def _resources_fulltext(cursor):
+    add_index(cursor, "academic_resources", "ft_resources_text", "title, authors, abstract",
+              kind="FULLTEXT", options="WITH PARSER ngram")
+
+@migration(3, "创建文件夹表 academic_folders 和用户分类表 user_categories")
+def _folders_and_categories(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS academic_folders (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL COMMENT '文件夹名称',
+        parent_id INT NULL COMMENT '父文件夹ID',
+        user_id INT NOT NULL COMMENT '所属用户ID',
+        description TEXT COMMENT '文件夹描述',
+        color VARCHAR(7) DEFAULT '#007bff' COMMENT '文件夹颜色',
+        sort_order INT DEFAULT 0 COMMENT '排序顺序',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+        FOREIGN KEY (parent_id) REFERENCES academic_folders(id) ON DELETE SET NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='学术资源文件夹表'
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_categories (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL COMMENT '分类名称',
+        user_id INT NOT NULL COMMENT '所属用户ID',
+        description TEXT COMMENT '分类描述',
+        color VARCHAR(7) DEFAULT '#6c757d' COMMENT '分类颜色',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户自定义分类表'
+    """)
+
+@migration(4, "academic_resources 增加 folder_id / user_category_id 列")
+def _resources_folder_category_columns(cursor):
+    add_column(cursor, "academic_resources", "folder_id", "INT NULL COMMENT '所属文件夹ID'")
+    add_column(cursor, "academic_resources", "user_category_id", "INT NULL COMMENT '用户分类ID'")
+
+@migration(5, "资源列表、文件夹、分类常用筛选的组合索引")
+def _composite_indexes(cursor):
+    # 资源列表：按用户 + 文件夹/分类/阅读状态筛选，按 (created_at, id) 排序
+    add_index(cursor, "academic_resources", "idx_resources_author_folder_created",
+              "author_id, folder_id, created_at, id")
+    add_index(cursor, "academic_resources", "idx_resources_author_category_created",
+              "author_id, user_category_id, created_at, id")
+    add_index(cursor, "academic_resources", "idx_resources_author_status_created",
+              "author_id, reading_status, created_at, id")
+    # 删除文件夹/分类时按 folder_id / user_category_id 批量更新资源
+    add_index(cursor, "academic_resources", "idx_resources_folder", "folder_id")
+    add_index(cursor, "academic_resources", "idx_resources_category", "user_category_id")
+    # 文件夹列表：按用户和父文件夹筛选，按 (sort_order, name) 排序
+    add_index(cursor, "academic_folders", "idx_folders_user_parent_sort",
+              "user_id, parent_id, sort_order, name")
+    # 分类列表：按用户筛选，按名称排序
+    add_index(cursor, "user_categories", "idx_categories_user_name", "user_id, name")
+    # 学科列表：按 (sort_order, name) 排序
+    add_index(cursor, "academic_subjects", "idx_subjects_sort", "sort_order, name")
+
+def build_folder_paths(folders) -> dict:
+    """根据 (id, parent_id) 计算每个文件夹的物化路径 /根ID/.../自身ID/"""
+    parents = {folder_id: parent_id for folder_id, parent_id in folders}
+    paths = {}
+
+    def path_of(folder_id, seen=()):
+        if folder_id in paths:
+            return paths[folder_id]
+        parent_id = parents.get(folder_id)
+        # 父文件夹不存在或出现环时视为根文件夹
+        if parent_id is None or parent_id not in parents or parent_id in seen:
+            prefix = "/"
+        else:
+            prefix = path_of(parent_id, seen + (folder_id,))
+        paths[folder_id] = f"{prefix}{folder_id}/"
+        return paths[folder_id]
+
+    for folder_id in parents:
+        path_of(folder_id)
+    return paths
+
+@migration(6, "academic_folders 增加物化路径 path 列并回填")
+def _folder_paths(cursor):
+    add_column(cursor, "academic_folders", "path",
+               "VARCHAR(1000) CHARACTER SET ascii COLLATE ascii_bin NOT NULL DEFAULT '' "
+               "COMMENT '物化路径，如 /1/5/9/'")
+    add_index(cursor, "academic_folders", "idx_folders_user_path", "user_id, path")
+
+    cursor.execute("SELECT id, parent_id FROM academic_folders")
+    paths = build_folder_paths(cursor.fetchall())
+    cursor.executemany(
+        "UPDATE academic_folders SET path = %s WHERE id = %s",
+        [(path, folder_id) for folder_id, path in paths.items()]
+    )
+
+@migration(7, "按标签筛选资源的索引 academic_resource_tags(tag_id, resource_id)")
+def _resource_tags_by_tag(cursor):
+    add_index(cursor, "academic_resource_tags", "idx_resource_tags_tag_resource", "tag_id, resource_id")
+
+@migration(8, "进程内缓存跨进程失效用的版本号表 cache_versions")
+def _cache_versions(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        name VARCHAR(100) CHARACTER SET ascii COLLATE ascii_bin PRIMARY KEY COMMENT '缓存名称，如 folders:1',
+        version BIGINT NOT NULL DEFAULT 0 COMMENT '版本号，写操作时加一',
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='缓存版本号表'
+    """)
+
+@migration(9, "file_storage 增加内容哈希 sha256（唯一）和引用计数 ref_count，用于上传文件去重")
+def _file_storage_dedup(cursor):
+    add_column(cursor, "file_storage", "sha256",
+               "CHAR(64) CHARACTER SET ascii COLLATE ascii_bin NULL COMMENT '文件内容的 SHA-256'")
+    add_column(cursor, "file_storage", "ref_count",
+               "INT NOT NULL DEFAULT 0 COMMENT '引用该文件的资源数，为 0 时回收'")
+    add_index(cursor, "file_storage", "uq_file_storage_sha256", "sha256", kind="UNIQUE")
+
+def run_migrations(verbose: bool = True) -> List[int]:
+    """执行所有未执行的迁移，返回本次执行的版本号"""
+    db = get_db_connection()
+    cursor = db.cursor()
+    applied_now = []
+
+    try:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY COMMENT '迁移版本号',
+            description VARCHAR(255) COMMENT '迁移说明',
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '执行时间'
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='数据库迁移记录表'
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+
+        for version, description, func in MIGRATIONS:
+            if version in applied:
+                continue
+            if verbose:
+                print(f"正在执行迁移 {version}: {description}")
+            # DDL 会隐式提交，迁移以单个版本为单位记录
+            func(cursor)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+            db.commit()
+            applied_now.append(version)
+            if verbose:
+                print(f"✓ 迁移 {version} 完成")
+
+        if verbose and not applied_now:
+            print("✓ 数据库结构已是最新")
+        return applied_now
+    finally:
+        cursor.close()
+        db.close()
+
+if __name__ == "__main__":
+    run_migrations()
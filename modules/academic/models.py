@@ -7,460 +7,1121 @@
 
 import os
 import json
+import base64
 import hashlib
-import time
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
-from config import get_db_connection
+import operator
+import re
+import tempfile
+import unicodedata
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, List, Dict, Optional, Sequence, Tuple
+from cache import VersionedCache, read_version, read_versions, bump_version
+from config import SEARCH_BACKEND, SEARCH_FULLTEXT_MODE, CACHE_TTL_SECONDS, CACHE_VERSION_CHECK_SECONDS, CACHE_MAX_ENTRIES, FILE_STORAGE_DIR
+from database import transaction, read_session, current_unit_of_work
+from modules.academic import search as search_index
+from modules.academic import tag_index
+
+# academic_resources 表的全部列
+RESOURCE_COLUMNS = (
+    'id', 'title', 'authors', 'abstract', 'content', 'file_path', 'file_type', 'subject',
+    'keywords', 'publication_year', 'citation_count', 'reading_status', 'notes', 'file_size',
+    'upload_time', 'author_id', 'folder_id', 'user_category_id', 'created_at', 'updated_at'
+)
+
+# 可返回的全部字段：表中的列加上关联表中的标签
+RESOURCE_FIELDS = RESOURCE_COLUMNS + ('tags',)
+
+# 列表默认返回的摘要字段：不含 abstract/content/notes 等大文本，完整内容由详情接口返回
+SUMMARY_FIELDS = tuple(field for field in RESOURCE_FIELDS if field not in ('abstract', 'content', 'notes'))
+
+# 多个标签筛选的组合方式：and 要求全部命中，or 命中任意一个
+TAG_MODES = ('and', 'or')
+
+# 资源阅读状态（与 academic_resources.reading_status 的 ENUM 一致）
+READING_STATUSES = ('unread', 'reading', 'completed', 'reviewing')
+
+# update_resource 可更新的字段
+UPDATABLE_FIELDS = (
+    'title', 'authors', 'abstract', 'content', 'subject', 'keywords', 'publication_year',
+    'reading_status', 'notes', 'folder_id', 'user_category_id'
+)
+
+# 批量操作类型：移动文件夹、设置分类、设置阅读状态、添加/移除标签、删除
+BATCH_OPERATIONS = ('move', 'set_category', 'set_status', 'add_tags', 'remove_tags', 'delete')
+
+def tag_key(name: str) -> str:
+    """标签名的比较键：忽略大小写和重音，近似 tags.name 的 utf8mb4_unicode_ci 排序规则"""
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+def resolve_resource_fields(spec: str = None) -> Tuple[str, ...]:
+    """
+    解析 fields 参数：逗号分隔的列名，或 summary（默认）/ all；
+    结果总是包含 id，未知列名抛出 ValueError
+    """
+    if not spec or spec == 'summary':
+        return SUMMARY_FIELDS
+    if spec == 'all':
+        return RESOURCE_FIELDS
+    fields = ['id']
+    for name in spec.split(','):
+        name = name.strip()
+        if not name or name in fields:
+            continue
+        if name not in RESOURCE_FIELDS:
+            raise ValueError(f"未知字段: {name}")
+        fields.append(name)
+    return tuple(fields)
+
+def _select_columns(fields: Sequence[str] = None) -> str:
+    """生成 SELECT 列清单（tags 等非表中字段不参与），keyset 分页需要的 created_at 总是选出"""
+    if not fields:
+        return "*"
+    columns = [field for field in fields if field in RESOURCE_COLUMNS]
+    for required in ('id', 'created_at'):
+        if required not in columns:
+            columns.append(required)
+    return ", ".join(columns)
+
+# AcademicResource 各列的默认值（与 RESOURCE_COLUMNS 顺序一致），keywords 为 JSON 文本
+_COLUMN_DEFAULTS = {
+    'title': '', 'authors': '', 'abstract': '', 'content': '', 'file_path': '', 'file_type': 'pdf',
+    'subject': '', 'keywords': None, 'citation_count': 0, 'reading_status': 'unread', 'notes': '',
+    'file_size': 0,
+}
+_DEFAULT_VALUES = tuple(_COLUMN_DEFAULTS.get(column) for column in RESOURCE_COLUMNS)
+_COLUMN_INDEX = {column: index for index, column in enumerate(RESOURCE_COLUMNS)}
+_KEYWORDS_INDEX = _COLUMN_INDEX['keywords']
+
+# 查询列清单 -> 把一行（接上默认值）重排为 RESOURCE_COLUMNS 顺序的 itemgetter，同一列清单只计算一次
+_row_readers: Dict[Tuple[str, ...], Callable] = {}
+
+def _row_reader(columns: Sequence[str]) -> Optional[Callable]:
+    """列清单就是 RESOURCE_COLUMNS 时返回 None（行可以直接使用）；不是表中的列（如 relevance）忽略"""
+    columns = tuple(columns)
+    if columns == RESOURCE_COLUMNS:
+        return None
+    reader = _row_readers.get(columns)
+    if reader is None:
+        positions = {column: index for index, column in enumerate(columns)}
+        reader = operator.itemgetter(*(
+            positions[column] if column in positions else len(columns) + index
+            for index, column in enumerate(RESOURCE_COLUMNS)
+        ))
+        _row_readers[columns] = reader
+    return reader
+
+def _column_property(index: int):
+    return property(lambda self: self._values[index])
 
 class AcademicResource:
-    """学术资源数据模型"""
+    """
+    学术资源数据模型
+    只读记录：各列的值按 RESOURCE_COLUMNS 顺序保存在一个元组中（可以直接是查询结果的行），
+    keywords 保存 JSON 文本，第一次访问时才解析；tags 由查询另行填充
+    """
+    
+    __slots__ = ('_values', '_keywords', 'tags')
     
     def __init__(self, **kwargs):
-        """初始化学术资源对象"""
-        self.id = kwargs.get('id')
-        self.title = kwargs.get('title', '')
-        self.authors = kwargs.get('authors', '')
-        self.abstract = kwargs.get('abstract', '')
-        self.content = kwargs.get('content', '')
-        self.file_path = kwargs.get('file_path', '')
-        self.file_type = kwargs.get('file_type', 'pdf')
-        self.subject = kwargs.get('subject', '')
-        self.keywords = kwargs.get('keywords', [])
-        self.publication_year = kwargs.get('publication_year')
-        self.citation_count = kwargs.get('citation_count', 0)
-        self.reading_status = kwargs.get('reading_status', 'unread')
-        self.notes = kwargs.get('notes', '')
-        self.file_size = kwargs.get('file_size', 0)
-        self.upload_time = kwargs.get('upload_time')
-        self.author_id = kwargs.get('author_id')
-        self.folder_id = kwargs.get('folder_id')
-        self.user_category_id = kwargs.get('user_category_id')
-        self.created_at = kwargs.get('created_at')
-        self.updated_at = kwargs.get('updated_at')
-    
-    def to_dict(self) -> Dict:
-        """转换为字典格式"""
-        return {
-            'id': self.id,
-            'title': self.title,
-            'authors': self.authors,
-            'abstract': self.abstract,
-            'content': self.content,
-            'file_path': self.file_path,
-            'file_type': self.file_type,
-            'subject': self.subject,
-            'keywords': self.keywords,
-            'publication_year': self.publication_year,
-            'citation_count': self.citation_count,
-            'reading_status': self.reading_status,
-            'notes': self.notes,
-            'file_size': self.file_size,
-            'upload_time': self.upload_time,
-            'author_id': self.author_id,
-            'folder_id': self.folder_id,
-            'user_category_id': self.user_category_id,
-            'created_at': self.created_at,
-            'updated_at': self.updated_at
-        }
+        """初始化学术资源对象（keywords 为列表）"""
+        self._values = tuple(kwargs.get(column, default) for column, default in zip(RESOURCE_COLUMNS, _DEFAULT_VALUES))
+        self._keywords = list(kwargs.get('keywords') or [])
+        self.tags = kwargs.get('tags', [])
+    
+    @property
+    def keywords(self) -> List[str]:
+        """关键词列表，第一次访问时解析 JSON"""
+        if self._keywords is None:
+            raw = self._values[_KEYWORDS_INDEX]
+            self._keywords = json.loads(raw) if raw else []
+        return self._keywords
+    
+    def to_dict(self, fields: Sequence[str] = None) -> Dict:
+        """转换为字典格式，指定 fields 时只包含这些字段"""
+        values = self._values
+        result = {}
+        for name in fields or RESOURCE_FIELDS:
+            if name == 'keywords':
+                result[name] = self.keywords
+            elif name == 'tags':
+                result[name] = self.tags
+            else:
+                result[name] = values[_COLUMN_INDEX[name]]
+        return result
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'AcademicResource':
         """从字典创建对象"""
         return cls(**data)
+    
+    @classmethod
+    def from_row(cls, columns: Sequence[str], row: Sequence) -> 'AcademicResource':
+        """从查询结果的一行（元组）创建对象，不经过中间字典；批量转换时用 from_rows"""
+        return cls.from_rows(columns, [row])[0]
+    
+    @classmethod
+    def from_rows(cls, columns: Sequence[str], rows: Sequence[Sequence]) -> List['AcademicResource']:
+        """把同一查询的多行（元组）转换为资源对象；查询了全部列时直接保存行本身"""
+        reader = _row_reader(columns)
+        new = cls.__new__
+        resources = []
+        for row in rows:
+            resource = new(cls)
+            resource._values = row if reader is None else reader(row + _DEFAULT_VALUES)
+            resource._keywords = None
+            resource.tags = []
+            resources.append(resource)
+        return resources
+
+for _index, _column in enumerate(RESOURCE_COLUMNS):
+    if _column != 'keywords':
+        setattr(AcademicResource, _column, _column_property(_index))
+del _index, _column
+
+def encode_page_cursor(created_at: datetime, resource_id: int) -> str:
+    """把 (created_at, id) 编码为不透明的分页游标"""
+    raw = json.dumps([created_at.isoformat(), resource_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_page_cursor(token: str) -> Tuple[datetime, int]:
+    """解析分页游标，格式不正确时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, resource_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(resource_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+# 全文索引覆盖的列，MATCH() 中的列必须与 FULLTEXT 索引完全一致
+FULLTEXT_COLUMNS = "title, authors, abstract"
+
+def fulltext_against(search: str, mode: str = None) -> Tuple[str, str]:
+    """生成 AGAINST 子句和检索词：boolean 模式下去掉运算符并要求每个词都出现"""
+    mode = mode or SEARCH_FULLTEXT_MODE
+    if mode == 'natural':
+        return "AGAINST (%s IN NATURAL LANGUAGE MODE)", search
+    words = re.sub(r'[+\-<>()~*"@]', ' ', search).split()
+    return "AGAINST (%s IN BOOLEAN MODE)", " ".join(f"+{word}" for word in words)
+
+_RESOURCE_INSERT_SQL = """
+INSERT INTO academic_resources 
+(title, authors, abstract, content, file_path, file_type, subject, 
+ keywords, publication_year, citation_count, reading_status, notes, 
+ file_size, author_id, folder_id, user_category_id)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def _read_cache_version(name: str) -> int:
+    with read_session() as session:
+        return read_version(session.cursor(), name)
+
+# 学科、分类、文件夹列表的进程内缓存，名称为 subjects / categories:<用户ID> / folders:<用户ID>；
+# resources:<用户ID> 只有版本号，用于资源列表的 HTTP 缓存校验
+_cache = VersionedCache(_read_cache_version, CACHE_TTL_SECONDS, CACHE_VERSION_CHECK_SECONDS, CACHE_MAX_ENTRIES)
+
+def _invalidate_cache(tx, name: str):
+    """在写操作的事务中递增缓存版本号（其他进程据此失效），提交后立即丢弃本进程的缓存"""
+    bump_version(tx.cursor(), name)
+    tx.on_commit(lambda: _cache.forget(name))
+
+def get_cache_versions(names: Sequence[str]) -> Tuple[Tuple[int, ...], Optional[datetime]]:
+    """
+    读取多个缓存名称的版本号（按 names 顺序，从未写入过的为 0）和其中最近的修改时间（UTC），
+    一条主键查询，用于生成 HTTP 缓存校验值
+    """
+    with read_session() as session:
+        versions = read_versions(session.cursor(), names)
+    modified = max((versions[name][1] for name in names if name in versions), default=0)
+    last_modified = datetime.fromtimestamp(modified, timezone.utc) if modified else None
+    return tuple(versions.get(name, (0, 0))[0] for name in names), last_modified
 
 class AcademicResourceManager:
     """学术资源管理器"""
     
+    @staticmethod
+    def _insert_values(resource_data: Dict) -> Tuple:
+        """资源数据对应 _RESOURCE_INSERT_SQL 的参数"""
+        return (
+            resource_data.get('title'),
+            resource_data.get('authors'),
+            resource_data.get('abstract'),
+            resource_data.get('content'),
+            resource_data.get('file_path'),
+            resource_data.get('file_type', 'pdf'),
+            resource_data.get('subject'),
+            json.dumps(resource_data.get('keywords', []), ensure_ascii=False),
+            resource_data.get('publication_year'),
+            resource_data.get('citation_count', 0),
+            resource_data.get('reading_status', 'unread'),
+            resource_data.get('notes'),
+            resource_data.get('file_size', 0),
+            resource_data.get('author_id'),
+            resource_data.get('folder_id'),
+            resource_data.get('user_category_id')
+        )
+    
     @staticmethod
     def create_resource(resource_data: Dict) -> int:
-        """创建新的学术资源"""
-        db = get_db_connection()
-        cursor = db.cursor()
-        
-        try:
-            # 处理关键词JSON
-            keywords_json = json.dumps(resource_data.get('keywords', []), ensure_ascii=False)
-            
-            sql = """
-            INSERT INTO academic_resources 
-            (title, authors, abstract, content, file_path, file_type, subject, 
-             keywords, publication_year, citation_count, reading_status, notes, 
-             file_size, author_id, folder_id, user_category_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
+        """创建新的学术资源（资源和标签关联在同一事务中写入）"""
+        with transaction() as tx:
+            cursor = tx.cursor()
             
-            values = (
-                resource_data.get('title'),
-                resource_data.get('authors'),
-                resource_data.get('abstract'),
-                resource_data.get('content'),
-                resource_data.get('file_path'),
-                resource_data.get('file_type', 'pdf'),
-                resource_data.get('subject'),
-                keywords_json,
-                resource_data.get('publication_year'),
-                resource_data.get('citation_count', 0),
-                resource_data.get('reading_status', 'unread'),
-                resource_data.get('notes'),
-                resource_data.get('file_size', 0),
-                resource_data.get('author_id'),
-                resource_data.get('folder_id'),
-                resource_data.get('user_category_id')
-            )
-            
-            cursor.execute(sql, values)
+            cursor.execute(_RESOURCE_INSERT_SQL, AcademicResourceManager._insert_values(resource_data))
             resource_id = cursor.lastrowid
             
             # 处理标签关联
             if resource_data.get('tags'):
-                AcademicResourceManager._link_tags(resource_id, resource_data['tags'])
+                AcademicResourceManager._link_tags(cursor, resource_data.get('author_id'), resource_id, resource_data['tags'])
+            
+            _invalidate_cache(tx, f"resources:{resource_data.get('author_id')}")
+            
+            # 提交后更新全文索引
+            document = dict(resource_data, id=resource_id)
+            tx.on_commit(lambda: search_index.index_resources([document]))
             
-            db.commit()
             return resource_id
+    
+    @staticmethod
+    def create_resources(resources: List[Dict]) -> List[int]:
+        """
+        批量创建学术资源，返回按输入顺序的资源ID
+        一条多行 INSERT 写入全部资源，标签关联批量写入，全部在同一事务中
+        """
+        if not resources:
+            return []
+        with transaction() as tx:
+            cursor = tx.cursor()
             
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            cursor.close()
-            db.close()
+            # executemany 会把 INSERT ... VALUES 改写为一条多行 INSERT；
+            # 多行 INSERT 属于 simple insert，InnoDB 一次性按 auto_increment_increment 步长分配自增值，
+            # lastrowid 为第一行的ID
+            cursor.executemany(
+                _RESOURCE_INSERT_SQL,
+                [AcademicResourceManager._insert_values(resource_data) for resource_data in resources]
+            )
+            if cursor.rowcount != len(resources):
+                raise RuntimeError(f"批量写入资源行数不符: 预期 {len(resources)}，实际 {cursor.rowcount}")
+            first_id = cursor.lastrowid
+            cursor.execute("SELECT @@auto_increment_increment")
+            step = cursor.fetchone()[0]
+            resource_ids = [first_id + index * step for index in range(len(resources))]
+            
+            # 核对推算出的ID确实是刚写入的行（作者一致），不一致时整体回滚，避免把标签和索引挂到其他行上
+            placeholders = ", ".join(["%s"] * len(resource_ids))
+            cursor.execute(
+                f"SELECT id, author_id FROM academic_resources WHERE id IN ({placeholders})",
+                resource_ids
+            )
+            written = dict(cursor.fetchall())
+            if any(resource_id not in written or written[resource_id] != resource_data.get('author_id')
+                   for resource_id, resource_data in zip(resource_ids, resources)):
+                raise RuntimeError("无法确定批量写入资源的ID")
+            
+            # 标签自动补全按用户统计，按作者分组关联
+            tags_by_author = {}
+            for resource_id, resource_data in zip(resource_ids, resources):
+                if resource_data.get('tags'):
+                    tags_by_author.setdefault(resource_data.get('author_id'), {})[resource_id] = resource_data['tags']
+            for author_id, tags_by_resource in tags_by_author.items():
+                AcademicResourceManager._link_resource_tags(cursor, author_id, tags_by_resource)
+            
+            for author_id in sorted({resource_data.get('author_id') for resource_data in resources}, key=str):
+                _invalidate_cache(tx, f'resources:{author_id}')
+            
+            documents = [dict(resource_data, id=resource_id)
+                         for resource_id, resource_data in zip(resource_ids, resources)]
+            tx.on_commit(lambda: search_index.index_resources(documents))
+            
+            return resource_ids
     
     @staticmethod
     def get_resource(resource_id: int) -> Optional[AcademicResource]:
         """获取单个学术资源"""
-        db = get_db_connection()
-        cursor = db.cursor(dictionary=True)
-        
-        try:
+        with read_session() as session:
+            cursor = session.cursor()
+            
             sql = "SELECT * FROM academic_resources WHERE id = %s"
             cursor.execute(sql, (resource_id,))
             result = cursor.fetchone()
             
             if result:
-                # 解析关键词JSON
-                if result.get('keywords'):
-                    result['keywords'] = json.loads(result['keywords'])
-                else:
-                    result['keywords'] = []
-                
-                return AcademicResource.from_dict(result)
+                resource = AcademicResource.from_row(cursor.column_names, result)
+                AcademicResourceManager._load_tags(cursor, [resource])
+                return resource
             return None
-            
-        finally:
-            cursor.close()
-            db.close()
+    
+    @staticmethod
+    def _build_filters(user_id: int, folder_id: int = None, category_id: int = None,
+                       status: str = None, search: str = None,
+                       search_mode: str = None,
+                       include_descendants: bool = False,
+                       tags: Sequence[str] = None,
+                       tag_mode: str = 'and') -> Tuple[List[str], List]:
+        """
+        构建资源列表的查询条件，search_mode 为 fulltext 时使用 MATCH ... AGAINST，否则使用 LIKE；
+        include_descendants 为 True 时 folder_id 匹配该文件夹及其全部子孙文件夹；
+        tags 按标签名筛选，tag_mode 为 and 时要求带有全部标签，为 or 时带有任意一个即可
+        """
+        where_conditions = ["author_id = %s"]
+        params = [user_id]
+        
+        if folder_id and include_descendants:
+            # 按物化路径前缀在同一条语句中展开子树，文件夹不属于该用户时子查询为空
+            where_conditions.append(
+                "folder_id IN (SELECT d.id FROM academic_folders f "
+                "JOIN academic_folders d ON d.user_id = f.user_id AND d.path LIKE CONCAT(f.path, '%') "
+                "WHERE f.id = %s AND f.user_id = %s)"
+            )
+            params.extend([folder_id, user_id])
+        elif folder_id:
+            where_conditions.append("folder_id = %s")
+            params.append(folder_id)
+        
+        if category_id:
+            where_conditions.append("user_category_id = %s")
+            params.append(category_id)
+        
+        if status:
+            where_conditions.append("reading_status = %s")
+            params.append(status)
+        
+        tag_names = AcademicResourceManager._normalize_tags(tags)
+        if tag_names:
+            # 标签名经唯一索引转为 tag_id，再走 (tag_id, resource_id) 索引取资源ID
+            placeholders = ", ".join(["%s"] * len(tag_names))
+            tag_sql = (
+                "SELECT rt.resource_id FROM academic_resource_tags rt JOIN tags t ON t.id = rt.tag_id "
+                f"WHERE t.name IN ({placeholders})"
+            )
+            params.extend(tag_names)
+            if tag_mode == 'and' and len(tag_names) > 1:
+                tag_sql += " GROUP BY rt.resource_id HAVING COUNT(*) = %s"
+                params.append(len(tag_names))
+            where_conditions.append(f"id IN ({tag_sql})")
+        
+        if search and (search_mode or SEARCH_BACKEND) == 'fulltext':
+            against, search_param = fulltext_against(search)
+            where_conditions.append(f"MATCH({FULLTEXT_COLUMNS}) {against}")
+            params.append(search_param)
+        elif search:
+            where_conditions.append("(title LIKE %s OR authors LIKE %s OR abstract LIKE %s)")
+            search_param = f"%{search}%"
+            params.extend([search_param, search_param, search_param])
+        
+        return where_conditions, params
+    
+    @staticmethod
+    def _rows_to_resources(columns: Sequence[str], rows: List[tuple]) -> List[AcademicResource]:
+        """把查询结果的元组行直接转换为资源对象"""
+        return AcademicResource.from_rows(columns, rows)
+    
+    @staticmethod
+    def _load_tags(cursor, resources: List[AcademicResource]):
+        """用一条查询取出整页资源的标签名，按资源分组后写入 resource.tags"""
+        if not resources:
+            return
+        by_id = {}
+        for resource in resources:
+            resource.tags = []
+            by_id[resource.id] = resource
+        placeholders = ", ".join(["%s"] * len(by_id))
+        cursor.execute(
+            "SELECT rt.resource_id, t.name FROM academic_resource_tags rt JOIN tags t ON t.id = rt.tag_id "
+            f"WHERE rt.resource_id IN ({placeholders}) ORDER BY t.name",
+            list(by_id)
+        )
+        for resource_id, name in cursor.fetchall():
+            by_id[resource_id].tags.append(name)
     
     @staticmethod
     def get_resources(user_id: int, page: int = 1, per_page: int = 20, 
                      folder_id: int = None, category_id: int = None, 
-                     status: str = None, search: str = None) -> Tuple[List[AcademicResource], int]:
-        """获取学术资源列表"""
-        db = get_db_connection()
-        cursor = db.cursor(dictionary=True)
-        
-        try:
-            # 构建查询条件
-            where_conditions = ["author_id = %s"]
-            params = [user_id]
-            
-            if folder_id:
-                where_conditions.append("folder_id = %s")
-                params.append(folder_id)
-            
-            if category_id:
-                where_conditions.append("user_category_id = %s")
-                params.append(category_id)
-            
-            if status:
-                where_conditions.append("reading_status = %s")
-                params.append(status)
-            
-            if search:
-                where_conditions.append("(title LIKE %s OR authors LIKE %s OR abstract LIKE %s)")
-                search_param = f"%{search}%"
-                params.extend([search_param, search_param, search_param])
+                     status: str = None, search: str = None,
+                     search_mode: str = None,
+                     fields: Sequence[str] = None,
+                     include_descendants: bool = False,
+                     tags: Sequence[str] = None,
+                     tag_mode: str = 'and') -> Tuple[List[AcademicResource], int]:
+        """
+        获取学术资源列表（OFFSET 分页）
+        search_mode 默认取配置 SEARCH_BACKEND，为 fulltext 时按全文相关度排序；
+        fields 指定只查询的列（见 resolve_resource_fields），默认查询全部列；
+        include_descendants 为 True 时列出 folder_id 及其全部子孙文件夹中的资源；
+        tags/tag_mode 按标签筛选（见 _build_filters），fields 包含 tags 时一并返回每个资源的标签
+        """
+        with read_session() as session:
+            # 元组游标：行直接转换为资源对象，不构造中间字典
+            cursor = session.cursor()
             
+            # 构建查询条件
+            where_conditions, params = AcademicResourceManager._build_filters(
+                user_id, folder_id, category_id, status, search, search_mode,
+                include_descendants=include_descendants, tags=tags, tag_mode=tag_mode)
             where_clause = " AND ".join(where_conditions)
             
+            # 全文检索时按相关度排序
+            select_clause = _select_columns(fields)
+            select_params = []
+            order_clause = "created_at DESC, id DESC"
+            if search and (search_mode or SEARCH_BACKEND) == 'fulltext':
+                against, search_param = fulltext_against(search)
+                select_clause += f", MATCH({FULLTEXT_COLUMNS}) {against} AS relevance"
+                select_params = [search_param]
+                order_clause = "relevance DESC, " + order_clause
+            
             # 获取总数
             count_sql = f"SELECT COUNT(*) as total FROM academic_resources WHERE {where_clause}"
             cursor.execute(count_sql, params)
-            total = cursor.fetchone()['total']
+            total = cursor.fetchone()[0]
             
             # 获取分页数据
             offset = (page - 1) * per_page
             sql = f"""
-            SELECT * FROM academic_resources 
+            SELECT {select_clause} FROM academic_resources 
             WHERE {where_clause}
-            ORDER BY created_at DESC 
+            ORDER BY {order_clause} 
             LIMIT %s OFFSET %s
             """
-            cursor.execute(sql, params + [per_page, offset])
-            results = cursor.fetchall()
-            
-            # 处理结果
-            resources = []
-            for result in results:
-                if result.get('keywords'):
-                    result['keywords'] = json.loads(result['keywords'])
-                else:
-                    result['keywords'] = []
-                resources.append(AcademicResource.from_dict(result))
+            cursor.execute(sql, select_params + params + [per_page, offset])
             
+            resources = AcademicResourceManager._rows_to_resources(cursor.column_names, cursor.fetchall())
+            if not fields or 'tags' in fields:
+                AcademicResourceManager._load_tags(cursor, resources)
             return resources, total
+    
+    @staticmethod
+    def get_resources_after(user_id: int, cursor: str = None, per_page: int = 20,
+                            folder_id: int = None, category_id: int = None,
+                            status: str = None, search: str = None,
+                            search_mode: str = None,
+                            fields: Sequence[str] = None,
+                            include_descendants: bool = False,
+                            tags: Sequence[str] = None,
+                            tag_mode: str = 'and') -> Tuple[List[AcademicResource], Optional[str]]:
+        """
+        获取学术资源列表（keyset 游标分页）
+        按 (created_at, id) 倒序，cursor 为上一页返回的 next_cursor，首页传 None；
+        不统计总数，返回 (资源列表, 下一页游标)，没有下一页时游标为 None
+        """
+        with read_session() as session:
+            db_cursor = session.cursor()
             
-        finally:
-            cursor.close()
-            db.close()
+            where_conditions, params = AcademicResourceManager._build_filters(
+                user_id, folder_id, category_id, status, search, search_mode,
+                include_descendants=include_descendants, tags=tags, tag_mode=tag_mode)
+            
+            if cursor:
+                created_at, last_id = decode_page_cursor(cursor)
+                where_conditions.append("(created_at < %s OR (created_at = %s AND id < %s))")
+                params.extend([created_at, created_at, last_id])
+            
+            where_clause = " AND ".join(where_conditions)
+            
+            # 多取一条用于判断是否还有下一页
+            sql = f"""
+            SELECT {_select_columns(fields)} FROM academic_resources 
+            WHERE {where_clause}
+            ORDER BY created_at DESC, id DESC 
+            LIMIT %s
+            """
+            db_cursor.execute(sql, params + [per_page + 1])
+            results = db_cursor.fetchall()
+            
+            has_more = len(results) > per_page
+            resources = AcademicResourceManager._rows_to_resources(db_cursor.column_names, results[:per_page])
+            next_cursor = None
+            if has_more:
+                last = resources[-1]
+                next_cursor = encode_page_cursor(last.created_at, last.id)
+            
+            if not fields or 'tags' in fields:
+                AcademicResourceManager._load_tags(db_cursor, resources)
+            return resources, next_cursor
     
     @staticmethod
-    def update_resource(resource_id: int, resource_data: Dict) -> bool:
-        """更新学术资源"""
-        db = get_db_connection()
-        cursor = db.cursor()
+    def search_resources(user_id: int, search: str, page: int = 1, per_page: int = 20,
+                         folder_id: int = None, category_id: int = None,
+                         status: str = None,
+                         fields: Sequence[str] = None,
+                         include_descendants: bool = False,
+                         tags: Sequence[str] = None,
+                         tag_mode: str = 'and') -> Tuple[List[AcademicResource], int, Dict[int, Dict[str, str]], bool]:
+        """
+        全文检索资源列表
+        由索引给出按相关度排序的候选ID，其余筛选条件和分页在数据库中完成；
+        返回 (资源列表, 总数, {资源ID: {字段: 高亮片段}}, 总数是否因 SEARCH_MAX_HITS 被截断)；
+        索引尚未完成全量构建时回退到数据库检索（没有高亮片段）
+        """
+        if not search_index.is_ready():
+            resources, total = AcademicResourceManager.get_resources(
+                user_id, page, per_page, folder_id, category_id, status, search,
+                fields=fields, include_descendants=include_descendants, tags=tags, tag_mode=tag_mode)
+            return resources, total, {}, False
         
-        try:
-            # 处理关键词JSON
-            keywords_json = json.dumps(resource_data.get('keywords', []), ensure_ascii=False)
+        ids, truncated = search_index.search_ids(user_id, search)
+        if not ids:
+            return [], 0, {}, False
+        
+        with read_session() as session:
+            cursor = session.cursor()
             
-            sql = """
-            UPDATE academic_resources SET
-            title = %s, authors = %s, abstract = %s, content = %s,
-            subject = %s, keywords = %s, publication_year = %s,
-            reading_status = %s, notes = %s, folder_id = %s, user_category_id = %s,
-            updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-            """
+            where_conditions, params = AcademicResourceManager._build_filters(
+                user_id, folder_id, category_id, status,
+                include_descendants=include_descendants, tags=tags, tag_mode=tag_mode)
+            id_placeholders = ", ".join(["%s"] * len(ids))
+            where_conditions.append(f"id IN ({id_placeholders})")
+            params.extend(ids)
+            where_clause = " AND ".join(where_conditions)
+            
+            cursor.execute(f"SELECT COUNT(*) as total FROM academic_resources WHERE {where_clause}", params)
+            total = cursor.fetchone()[0]
             
-            values = (
-                resource_data.get('title'),
-                resource_data.get('authors'),
-                resource_data.get('abstract'),
-                resource_data.get('content'),
-                resource_data.get('subject'),
-                keywords_json,
-                resource_data.get('publication_year'),
-                resource_data.get('reading_status'),
-                resource_data.get('notes'),
-                resource_data.get('folder_id'),
-                resource_data.get('user_category_id'),
-                resource_id
+            # 按索引给出的相关度顺序分页
+            offset = (page - 1) * per_page
+            sql = f"""
+            SELECT {_select_columns(fields)} FROM academic_resources 
+            WHERE {where_clause}
+            ORDER BY FIELD(id, {id_placeholders}) 
+            LIMIT %s OFFSET %s
+            """
+            cursor.execute(sql, params + ids + [per_page, offset])
+            resources = AcademicResourceManager._rows_to_resources(cursor.column_names, cursor.fetchall())
+            if not fields or 'tags' in fields:
+                AcademicResourceManager._load_tags(cursor, resources)
+        
+        snippets = search_index.highlights(user_id, search, [resource.id for resource in resources])
+        return resources, total, snippets, truncated
+    
+    @staticmethod
+    def get_resource_file(resource_id: int, user_id: int) -> Optional[Dict]:
+        """获取用户自己的资源的文件信息 {title, file_path, file_type}，资源不存在或不属于该用户时返回 None"""
+        with read_session() as session:
+            cursor = session.cursor(dictionary=True)
+            cursor.execute(
+                "SELECT title, file_path, file_type FROM academic_resources WHERE id = %s AND author_id = %s",
+                (resource_id, user_id)
             )
+            return cursor.fetchone()
+    
+    @staticmethod
+    def update_resource(resource_id: int, resource_data: Dict, user_id: int = None) -> bool:
+        """
+        更新学术资源（资源和标签关联在同一事务中写入），只更新 resource_data 中给出的字段；
+        指定 user_id 时只更新该用户的资源，资源不存在或不属于该用户时返回 False
+        """
+        with transaction() as tx:
+            cursor = tx.cursor()
             
-            cursor.execute(sql, values)
+            updates = []
+            params = []
+            for field in UPDATABLE_FIELDS:
+                if field not in resource_data:
+                    continue
+                value = resource_data[field]
+                if field == 'keywords':
+                    # 处理关键词JSON
+                    value = json.dumps(value or [], ensure_ascii=False)
+                updates.append(f"{field} = %s")
+                params.append(value)
+            updates.append("updated_at = CURRENT_TIMESTAMP")
             
-            # 更新标签关联
+            # 归属条件直接放在 UPDATE 中，无需先查询资源（rowcount 为匹配行数，见 config.connect_db）
+            where_clause = "id = %s"
+            params.append(resource_id)
+            if user_id is not None:
+                where_clause += " AND author_id = %s"
+                params.append(user_id)
+            
+            cursor.execute(f"UPDATE academic_resources SET {', '.join(updates)} WHERE {where_clause}", params)
+            if cursor.rowcount == 0:
+                return False
+            
+            owner_id = user_id
+            if owner_id is None:
+                cursor.execute("SELECT author_id FROM academic_resources WHERE id = %s", (resource_id,))
+                owner_id = cursor.fetchone()[0]
+            
+            # 更新标签关联（只处理有变化的标签）
             if 'tags' in resource_data:
-                AcademicResourceManager._unlink_tags(resource_id)
-                if resource_data['tags']:
-                    AcademicResourceManager._link_tags(resource_id, resource_data['tags'])
+                AcademicResourceManager._set_tags(cursor, owner_id, resource_id, resource_data['tags'])
             
-            db.commit()
-            return cursor.rowcount > 0
+            # 所有写路径的加锁顺序一致：资源行、标签，最后是缓存版本行，避免并发写同一资源时死锁
+            _invalidate_cache(tx, f'resources:{owner_id}')
             
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            cursor.close()
-            db.close()
+            AcademicResourceManager._reindex(tx, [resource_id])
+            
+            return True
     
     @staticmethod
-    def delete_resource(resource_id: int) -> bool:
-        """删除学术资源"""
-        db = get_db_connection()
-        cursor = db.cursor()
-        
-        try:
-            # 先获取文件路径
-            cursor.execute("SELECT file_path FROM academic_resources WHERE id = %s", (resource_id,))
+    def delete_resource(resource_id: int, user_id: int = None) -> bool:
+        """删除学术资源，指定 user_id 时只删除该用户的资源，资源不存在或不属于该用户时返回 False"""
+        with transaction() as tx:
+            cursor = tx.cursor()
+            
+            # 先获取文件路径（同时检查归属并锁定该行）
+            sql = "SELECT file_path, author_id FROM academic_resources WHERE id = %s"
+            params = [resource_id]
+            if user_id is not None:
+                sql += " AND author_id = %s"
+                params.append(user_id)
+            cursor.execute(sql + " FOR UPDATE", params)
             result = cursor.fetchone()
+            if not result:
+                return False
+            
+            # 删除关联的标签（须在删除资源之前，否则外键级联会先删掉关联，使用次数无法回退）
+            AcademicResourceManager._unlink_tags(cursor, result[1], resource_id)
             
             # 删除数据库记录
             cursor.execute("DELETE FROM academic_resources WHERE id = %s", (resource_id,))
+            deleted = cursor.rowcount > 0
             
-            # 删除关联的标签
-            AcademicResourceManager._unlink_tags(resource_id)
+            # 释放文件引用，提交后再回收物理文件和删除索引文档，回滚时保持不变
+            if result[0]:
+                FileManager.release_files(tx, [result[0]])
+            tx.on_commit(lambda: search_index.remove_resources([resource_id]))
             
-            # 删除物理文件
-            if result and result[0]:
-                file_path = result[0]
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                    except OSError:
-                        pass  # 忽略文件删除错误
+            # 缓存版本行最后更新，与批量删除的加锁顺序一致
+            _invalidate_cache(tx, f'resources:{result[1]}')
             
-            db.commit()
-            return cursor.rowcount > 0
-            
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            cursor.close()
-            db.close()
+            return deleted
     
     @staticmethod
-    def _link_tags(resource_id: int, tags: List[str]):
-        """关联标签到资源"""
-        db = get_db_connection()
-        cursor = db.cursor()
+    def batch_update(user_id: int, resource_ids: List[int], operation: str, value=None) -> List[Dict]:
+        """
+        批量操作资源（operation 见 BATCH_OPERATIONS）
+        一条查询检查全部ID的归属，再用集合式 UPDATE/DELETE 在同一事务中完成；
+        返回每个ID的结果 [{id, success, message}]，操作或参数不合法时抛出 ValueError
+        """
+        if operation not in BATCH_OPERATIONS:
+            raise ValueError(f"不支持的批量操作: {operation}")
+        if operation == 'set_status' and value not in READING_STATUSES:
+            raise ValueError(f"阅读状态只能是 {' / '.join(READING_STATUSES)}")
+        if operation in ('move', 'set_category') and value is not None:
+            # 目标ID会直接传给驱动，只接受整数或数字字符串（列表、字典等按参数错误处理）
+            invalid = "目标文件夹ID无效" if operation == 'move' else "目标分类ID无效"
+            if isinstance(value, bool) or not isinstance(value, (int, str)):
+                raise ValueError(invalid)
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError(invalid) from None
+        tag_names = []
+        if operation in ('add_tags', 'remove_tags'):
+            tag_names = AcademicResourceManager._normalize_tags(value if isinstance(value, list) else [value])
+            if not tag_names:
+                raise ValueError("标签不能为空")
         
-        try:
-            for tag_name in tags:
-                # 获取或创建标签
-                cursor.execute("SELECT id FROM tags WHERE name = %s", (tag_name,))
-                result = cursor.fetchone()
-                
-                if result:
-                    tag_id = result[0]
+        # 去重并保持顺序
+        ids = list(dict.fromkeys(int(resource_id) for resource_id in resource_ids))
+        if not ids:
+            return []
+        
+        with transaction() as tx:
+            cursor = tx.cursor()
+            
+            # 一条查询检查全部资源的归属
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(
+                f"SELECT id, author_id, file_path FROM academic_resources WHERE id IN ({placeholders})",
+                ids
+            )
+            found = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+            
+            results = []
+            owned = []
+            for resource_id in ids:
+                if resource_id not in found:
+                    results.append({'id': resource_id, 'success': False, 'message': '资源不存在'})
+                elif found[resource_id][0] != user_id:
+                    results.append({'id': resource_id, 'success': False, 'message': '无权限操作此资源'})
                 else:
-                    cursor.execute("INSERT INTO tags (name) VALUES (%s)", (tag_name,))
-                    tag_id = cursor.lastrowid
-                
-                # 关联标签
+                    results.append({'id': resource_id, 'success': True, 'message': '操作成功'})
+                    owned.append(resource_id)
+            if not owned:
+                return results
+            
+            owned_placeholders = ", ".join(["%s"] * len(owned))
+            scope = f"author_id = %s AND id IN ({owned_placeholders})"
+            scope_params = [user_id] + owned
+            
+            if operation in ('move', 'set_category'):
+                # 目标为 None 时移到根目录 / 清除分类，否则目标必须属于当前用户
+                table, column = (('academic_folders', 'folder_id') if operation == 'move'
+                                 else ('user_categories', 'user_category_id'))
+                if value is not None:
+                    cursor.execute(f"SELECT 1 FROM {table} WHERE id = %s AND user_id = %s", (value, user_id))
+                    if cursor.fetchone() is None:
+                        raise ValueError("目标文件夹不存在或无权限" if operation == 'move'
+                                         else "目标分类不存在或无权限")
+                cursor.execute(f"UPDATE academic_resources SET {column} = %s WHERE {scope}",
+                               [value] + scope_params)
+            
+            elif operation == 'set_status':
+                cursor.execute(f"UPDATE academic_resources SET reading_status = %s WHERE {scope}",
+                               [value] + scope_params)
+            
+            elif operation == 'add_tags':
+                AcademicResourceManager._link_resource_tags(
+                    cursor, user_id, {resource_id: tag_names for resource_id in owned})
+            
+            elif operation == 'remove_tags':
                 cursor.execute(
-                    "INSERT IGNORE INTO academic_resource_tags (resource_id, tag_id) VALUES (%s, %s)",
-                    (resource_id, tag_id)
+                    f"SELECT id FROM tags WHERE name IN ({', '.join(['%s'] * len(tag_names))})",
+                    tag_names
                 )
+                tag_ids = [row[0] for row in cursor.fetchall()]
+                AcademicResourceManager._unlink_resource_tags(cursor, user_id, owned, tag_ids)
+            
+            elif operation == 'delete':
+                # 先取消标签关联再删除资源，使用次数才能正确回退
+                AcademicResourceManager._unlink_resource_tags(cursor, user_id, owned)
+                cursor.execute(f"DELETE FROM academic_resources WHERE {scope}", scope_params)
                 
-                # 更新标签使用次数
-                cursor.execute("UPDATE tags SET usage_count = usage_count + 1 WHERE id = %s", (tag_id,))
+                file_paths = [found[resource_id][1] for resource_id in owned if found[resource_id][1]]
+                FileManager.release_files(tx, file_paths)
+                tx.on_commit(lambda: search_index.remove_resources(owned))
             
-            db.commit()
+            # 缓存版本行最后更新，与单条资源的写路径加锁顺序一致（资源行、标签、版本行）
+            _invalidate_cache(tx, f'resources:{user_id}')
             
-        finally:
-            cursor.close()
-            db.close()
+            return results
+    
+    @staticmethod
+    def _reindex(tx, resource_ids: List[int]):
+        """读取资源最新的可检索字段，在事务提交后写入全文索引"""
+        if not search_index.is_enabled() or not resource_ids:
+            return
+        cursor = tx.cursor(dictionary=True)
+        placeholders = ", ".join(["%s"] * len(resource_ids))
+        cursor.execute(
+            "SELECT id, author_id, title, authors, abstract, keywords, notes "
+            f"FROM academic_resources WHERE id IN ({placeholders})",
+            list(resource_ids)
+        )
+        rows = cursor.fetchall()
+        if rows:
+            tx.on_commit(lambda: search_index.index_resources(rows))
     
     @staticmethod
-    def _unlink_tags(resource_id: int):
-        """取消标签关联"""
-        db = get_db_connection()
-        cursor = db.cursor()
+    def _normalize_tags(tags: List[str]) -> List[str]:
+        """清理标签名：去空白、去空值、按 tag_key 去重（与表的排序规则一致）"""
+        names = []
+        seen = set()
+        for tag in tags or []:
+            name = str(tag).strip()[:50]
+            key = tag_key(name)
+            if name and key not in seen:
+                seen.add(key)
+                names.append(name)
+        return names
+    
+    @staticmethod
+    def _get_or_create_tags(cursor, names: List[str]) -> List[Tuple[int, str]]:
+        """批量获取或创建标签：一条多行 upsert 加一条查询，返回 [(标签ID, 名称)]"""
+        placeholders = ", ".join(["%s"] * len(names))
+        cursor.execute(
+            f"INSERT INTO tags (name) VALUES {', '.join(['(%s)'] * len(names))} "
+            "ON DUPLICATE KEY UPDATE id = id",
+            names
+        )
+        cursor.execute(f"SELECT id, name FROM tags WHERE name IN ({placeholders})", names)
+        return [(row[0], row[1]) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _after_commit(callback):
+        """在当前事务提交后执行回调（不在事务中时立即执行）"""
+        tx = current_unit_of_work()
+        if tx is not None:
+            tx.on_commit(callback)
+        else:
+            callback()
+    
+    @staticmethod
+    def _adjust_usage_counts(cursor, counts: Counter, sign: int):
+        """按变化量分组更新标签使用次数，语句数等于不同变化量的个数"""
+        by_amount = {}
+        for tag_id, amount in counts.items():
+            by_amount.setdefault(amount, []).append(tag_id)
+        for amount, tag_ids in by_amount.items():
+            placeholders = ", ".join(["%s"] * len(tag_ids))
+            if sign > 0:
+                expression = "usage_count + %s"
+            else:
+                expression = "GREATEST(usage_count - %s, 0)"
+            cursor.execute(
+                f"UPDATE tags SET usage_count = {expression} WHERE id IN ({placeholders})",
+                [amount] + tag_ids
+            )
+    
+    @staticmethod
+    def _link_resource_tags(cursor, user_id: int, tags_by_resource: Dict[int, List[str]]):
+        """
+        批量关联标签：{资源ID: 标签名列表}，资源都属于 user_id（使用调用方事务中的游标）
+        所有资源的标签一起 upsert，已有的关联跳过，只有新建立的关联才计入使用次数；
+        语句数与资源个数和标签个数无关
+        """
+        names_by_resource = {
+            resource_id: AcademicResourceManager._normalize_tags(tags)
+            for resource_id, tags in tags_by_resource.items()
+        }
+        all_names = AcademicResourceManager._normalize_tags(
+            [name for names in names_by_resource.values() for name in names])
+        if not all_names:
+            return
         
-        try:
-            # 获取关联的标签ID
-            cursor.execute("SELECT tag_id FROM academic_resource_tags WHERE resource_id = %s", (resource_id,))
-            tag_ids = [row[0] for row in cursor.fetchall()]
-            
-            # 删除关联
-            cursor.execute("DELETE FROM academic_resource_tags WHERE resource_id = %s", (resource_id,))
-            
-            # 更新标签使用次数
-            for tag_id in tag_ids:
-                cursor.execute("UPDATE tags SET usage_count = GREATEST(usage_count - 1, 0) WHERE id = %s", (tag_id,))
-            
-            db.commit()
-            
-        finally:
-            cursor.close()
-            db.close()
+        tags = AcademicResourceManager._get_or_create_tags(cursor, all_names)
+        if not tags:
+            return
+        tags_by_key = {tag_key(name): (tag_id, name) for tag_id, name in tags}
+        
+        wanted = []
+        for resource_id, names in names_by_resource.items():
+            for name in names:
+                tag = tags_by_key.get(tag_key(name))
+                if tag is not None:
+                    wanted.append((resource_id, tag[0]))
+        if not wanted:
+            return
+        
+        resource_ids = list(names_by_resource)
+        tag_ids = [tag_id for tag_id, _ in tags]
+        cursor.execute(
+            "SELECT resource_id, tag_id FROM academic_resource_tags "
+            f"WHERE resource_id IN ({', '.join(['%s'] * len(resource_ids))}) "
+            f"AND tag_id IN ({', '.join(['%s'] * len(tag_ids))})",
+            resource_ids + tag_ids
+        )
+        linked = {(row[0], row[1]) for row in cursor.fetchall()}
+        new_links = [link for link in wanted if link not in linked]
+        if not new_links:
+            return
+        
+        # 关联标签
+        cursor.execute(
+            "INSERT IGNORE INTO academic_resource_tags (resource_id, tag_id) VALUES "
+            + ", ".join(["(%s, %s)"] * len(new_links)),
+            [value for link in new_links for value in link]
+        )
+        
+        # 更新标签使用次数
+        counts = Counter(tag_id for _, tag_id in new_links)
+        AcademicResourceManager._adjust_usage_counts(cursor, counts, 1)
+        
+        names_by_id = {tag_id: name for tag_id, name in tags}
+        linked_tags = [(tag_id, names_by_id[tag_id]) for _, tag_id in new_links]
+        AcademicResourceManager._after_commit(lambda: tag_index.record_linked(user_id, linked_tags))
+    
+    @staticmethod
+    def _unlink_resource_tags(cursor, user_id: int, resource_ids: List[int], tag_ids: List[int] = None):
+        """批量取消 user_id 的资源的标签关联（使用调用方事务中的游标），不指定 tag_ids 时取消这些资源的全部关联"""
+        if not resource_ids or tag_ids is not None and not tag_ids:
+            return
+        
+        where_clause = f"resource_id IN ({', '.join(['%s'] * len(resource_ids))})"
+        params = list(resource_ids)
+        if tag_ids is not None:
+            where_clause += f" AND tag_id IN ({', '.join(['%s'] * len(tag_ids))})"
+            params += list(tag_ids)
+        
+        # 获取实际存在的关联，据此回退使用次数
+        cursor.execute(f"SELECT tag_id FROM academic_resource_tags WHERE {where_clause}", params)
+        unlinked = [row[0] for row in cursor.fetchall()]
+        if not unlinked:
+            return
+        
+        # 删除关联
+        cursor.execute(f"DELETE FROM academic_resource_tags WHERE {where_clause}", params)
+        
+        # 更新标签使用次数
+        AcademicResourceManager._adjust_usage_counts(cursor, Counter(unlinked), -1)
+        
+        AcademicResourceManager._after_commit(lambda: tag_index.record_unlinked(user_id, unlinked))
+    
+    @staticmethod
+    def _link_tags(cursor, user_id: int, resource_id: int, tags: List[str]):
+        """关联标签到 user_id 的资源（使用调用方事务中的游标，语句数与标签个数无关）"""
+        AcademicResourceManager._link_resource_tags(cursor, user_id, {resource_id: tags})
+    
+    @staticmethod
+    def _unlink_tags(cursor, user_id: int, resource_id: int, tag_ids: List[int] = None):
+        """取消 user_id 的资源的标签关联（使用调用方事务中的游标），不指定 tag_ids 时取消全部关联"""
+        AcademicResourceManager._unlink_resource_tags(cursor, user_id, [resource_id], tag_ids)
+    
+    @staticmethod
+    def _set_tags(cursor, user_id: int, resource_id: int, tags: List[str]):
+        """将 user_id 的资源的标签设为给定集合：与现有标签比较，只增删发生变化的部分"""
+        names = AcademicResourceManager._normalize_tags(tags)
+        
+        cursor.execute(
+            "SELECT t.id, t.name FROM academic_resource_tags rt JOIN tags t ON t.id = rt.tag_id "
+            "WHERE rt.resource_id = %s",
+            (resource_id,)
+        )
+        current = {tag_key(name): tag_id for tag_id, name in cursor.fetchall()}
+        wanted = {tag_key(name) for name in names}
+        
+        removed_ids = [tag_id for key, tag_id in current.items() if key not in wanted]
+        added_names = [name for name in names if tag_key(name) not in current]
+        
+        AcademicResourceManager._unlink_tags(cursor, user_id, resource_id, removed_ids)
+        AcademicResourceManager._link_tags(cursor, user_id, resource_id, added_names)
 
 class SubjectManager:
     """学科分类管理器"""
     
     @staticmethod
     def get_all_subjects() -> List[Dict]:
-        """获取所有学科分类"""
-        db = get_db_connection()
-        cursor = db.cursor(dictionary=True)
+        """获取所有学科分类（带进程内缓存）"""
+        def load():
+            with read_session() as session:
+                cursor = session.cursor(dictionary=True)
+                
+                sql = "SELECT * FROM academic_subjects ORDER BY sort_order, name"
+                cursor.execute(sql)
+                return cursor.fetchall()
         
-        try:
-            sql = "SELECT * FROM academic_subjects ORDER BY sort_order, name"
-            cursor.execute(sql)
-            return cursor.fetchall()
-        finally:
-            cursor.close()
-            db.close()
+        return _cache.get('subjects', load)
     
     @staticmethod
     def create_subject(name: str, parent_id: int = None, description: str = '') -> int:
         """创建新学科分类"""
-        db = get_db_connection()
-        cursor = db.cursor()
-        
-        try:
+        with transaction() as tx:
+            cursor = tx.cursor()
+            
             sql = """
             INSERT INTO academic_subjects (name, parent_id, description) 
             VALUES (%s, %s, %s)
             """
             cursor.execute(sql, (name, parent_id, description))
             subject_id = cursor.lastrowid
-            db.commit()
+            _invalidate_cache(tx, 'subjects')
             return subject_id
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            cursor.close()
-            db.close()
 
 class FolderManager:
     """文件夹管理器"""
     
     @staticmethod
     def create_folder(name: str, user_id: int, parent_id: int = None, description: str = '', color: str = '#007bff') -> int:
-        """创建文件夹"""
-        db = get_db_connection()
-        cursor = db.cursor()
-        
-        try:
+        """创建文件夹，父文件夹必须属于同一用户，否则抛出 ValueError"""
+        with transaction() as tx:
+            cursor = tx.cursor()
+            
+            # 物化路径 = 父文件夹路径 + 自身ID
+            parent_path = "/"
+            if parent_id is not None:
+                cursor.execute(
+                    "SELECT path FROM academic_folders WHERE id = %s AND user_id = %s",
+                    (parent_id, user_id)
+                )
+                parent = cursor.fetchone()
+                if not parent:
+                    raise ValueError("父文件夹不存在或无权限")
+                parent_path = parent[0]
+            
             sql = """
             INSERT INTO academic_folders (name, parent_id, user_id, description, color) 
             VALUES (%s, %s, %s, %s, %s)
             """
             cursor.execute(sql, (name, parent_id, user_id, description, color))
             folder_id = cursor.lastrowid
-            db.commit()
+            cursor.execute(
+                "UPDATE academic_folders SET path = %s WHERE id = %s",
+                (f"{parent_path}{folder_id}/", folder_id)
+            )
+            _invalidate_cache(tx, f'folders:{user_id}')
             return folder_id
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            cursor.close()
-            db.close()
     
     @staticmethod
-    def get_folders(user_id: int, parent_id: int = None) -> List[Dict]:
-        """获取文件夹列表"""
-        db = get_db_connection()
-        cursor = db.cursor(dictionary=True)
+    def _get_all_folders(user_id: int) -> List[Dict]:
+        """获取用户的全部文件夹，按 (sort_order, name) 排序（带进程内缓存）"""
+        def load():
+            with read_session() as session:
+                cursor = session.cursor(dictionary=True)
+                cursor.execute(
+                    "SELECT * FROM academic_folders WHERE user_id = %s ORDER BY sort_order, name",
+                    (user_id,)
+                )
+                return cursor.fetchall()
         
-        try:
-            if parent_id is None:
-                sql = "SELECT * FROM academic_folders WHERE user_id = %s AND parent_id IS NULL ORDER BY sort_order, name"
-                cursor.execute(sql, (user_id,))
-            else:
-                sql = "SELECT * FROM academic_folders WHERE user_id = %s AND parent_id = %s ORDER BY sort_order, name"
-                cursor.execute(sql, (user_id, parent_id))
-            
-            return cursor.fetchall()
-        finally:
-            cursor.close()
-            db.close()
+        return _cache.get(f'folders:{user_id}', load)
+    
+    @staticmethod
+    def get_folders(user_id: int, parent_id: int = None) -> List[Dict]:
+        """获取文件夹列表（从用户全部文件夹的缓存中筛选）"""
+        return [folder for folder in FolderManager._get_all_folders(user_id)
+                if folder['parent_id'] == parent_id]
     
     @staticmethod
     def get_folder_tree(user_id: int) -> List[Dict]:
-        """获取文件夹树形结构"""
-        def build_tree(parent_id=None):
-            folders = FolderManager.get_folders(user_id, parent_id)
-            for folder in folders:
-                children = build_tree(folder['id'])
-                folder['children'] = children if children else []
-            return folders
+        """获取文件夹树形结构（取出全部文件夹，在内存中 O(n) 组装）"""
+        folders = FolderManager._get_all_folders(user_id)
+        
+        by_id = {}
+        for folder in folders:
+            folder['children'] = []
+            by_id[folder['id']] = folder
         
-        return build_tree()
+        # 按查询顺序挂到父节点下，兄弟节点保持 (sort_order, name) 顺序；父节点缺失时作为根节点
+        roots = []
+        for folder in folders:
+            parent = by_id.get(folder['parent_id'])
+            if parent is not None:
+                parent['children'].append(folder)
+            else:
+                roots.append(folder)
+        return roots
     
     @staticmethod
-    def update_folder(folder_id: int, name: str = None, description: str = None, color: str = None) -> bool:
-        """更新文件夹信息"""
-        db = get_db_connection()
-        cursor = db.cursor()
-        
-        try:
+    def get_subtree_ids(user_id: int, folder_id: int) -> List[int]:
+        """按物化路径取文件夹及其全部子孙文件夹的ID，文件夹不存在时返回空列表"""
+        with read_session() as session:
+            cursor = session.cursor()
+            cursor.execute(
+                "SELECT path FROM academic_folders WHERE id = %s AND user_id = %s",
+                (folder_id, user_id)
+            )
+            folder = cursor.fetchone()
+            if not folder:
+                return []
+            # 前缀匹配可以走 (user_id, path) 索引的范围扫描
+            cursor.execute(
+                "SELECT id FROM academic_folders WHERE user_id = %s AND path LIKE %s",
+                (user_id, f"{folder[0]}%")
+            )
+            return [row[0] for row in cursor.fetchall()]
+    
+    @staticmethod
+    def get_breadcrumbs(user_id: int, folder_id: int) -> List[Dict]:
+        """按物化路径取从根文件夹到当前文件夹的路径（面包屑），文件夹不存在时返回空列表"""
+        with read_session() as session:
+            cursor = session.cursor(dictionary=True)
+            cursor.execute(
+                "SELECT path FROM academic_folders WHERE id = %s AND user_id = %s",
+                (folder_id, user_id)
+            )
+            folder = cursor.fetchone()
+            if not folder:
+                return []
+            
+            ancestor_ids = [int(part) for part in folder['path'].strip('/').split('/') if part]
+            placeholders = ", ".join(["%s"] * len(ancestor_ids))
+            cursor.execute(
+                f"SELECT id, name, color FROM academic_folders WHERE user_id = %s AND id IN ({placeholders})",
+                [user_id] + ancestor_ids
+            )
+            by_id = {row['id']: row for row in cursor.fetchall()}
+            return [by_id[ancestor_id] for ancestor_id in ancestor_ids if ancestor_id in by_id]
+    
+    @staticmethod
+    def update_folder(folder_id: int, name: str = None, description: str = None, color: str = None,
+                      user_id: int = None) -> bool:
+        """更新文件夹信息，指定 user_id 时只更新该用户的文件夹"""
+        with transaction() as tx:
+            cursor = tx.cursor()
+            
             updates = []
             params = []
             
@@ -475,37 +1136,49 @@ class FolderManager:
                 params.append(color)
             
             if updates:
+                if user_id is None:
+                    cursor.execute("SELECT user_id FROM academic_folders WHERE id = %s", (folder_id,))
+                    owner = cursor.fetchone()
+                    if not owner:
+                        return False
+                    owner_id = owner[0]
+                else:
+                    owner_id = user_id
+                
                 updates.append("updated_at = CURRENT_TIMESTAMP")
                 params.append(folder_id)
                 
                 sql = f"UPDATE academic_folders SET {', '.join(updates)} WHERE id = %s"
+                if user_id is not None:
+                    sql += " AND user_id = %s"
+                    params.append(user_id)
                 cursor.execute(sql, params)
-                db.commit()
-                return cursor.rowcount > 0
+                if cursor.rowcount == 0:
+                    return False
+                _invalidate_cache(tx, f'folders:{owner_id}')
+                return True
             
             return False
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            cursor.close()
-            db.close()
     
     @staticmethod
-    def delete_folder(folder_id: int) -> bool:
-        """删除文件夹（会同时删除子文件夹和移动文件到父文件夹）"""
-        db = get_db_connection()
-        cursor = db.cursor()
-        
-        try:
-            # 获取文件夹信息
-            cursor.execute("SELECT parent_id, user_id FROM academic_folders WHERE id = %s", (folder_id,))
+    def delete_folder(folder_id: int, user_id: int = None) -> bool:
+        """删除文件夹（子文件夹和文件移动到父文件夹），指定 user_id 时只删除该用户的文件夹"""
+        with transaction() as tx:
+            cursor = tx.cursor()
+            
+            # 获取文件夹信息（同时检查归属并锁定该行）
+            sql = "SELECT parent_id, user_id, path FROM academic_folders WHERE id = %s"
+            params = [folder_id]
+            if user_id is not None:
+                sql += " AND user_id = %s"
+                params.append(user_id)
+            cursor.execute(sql + " FOR UPDATE", params)
             folder_info = cursor.fetchone()
             
             if not folder_info:
                 return False
             
-            parent_id, user_id = folder_info
+            parent_id, user_id, path = folder_info
             
             # 将文件夹内的文件移动到父文件夹
             cursor.execute("UPDATE academic_resources SET folder_id = %s WHERE folder_id = %s", (parent_id, folder_id))
@@ -513,17 +1186,21 @@ class FolderManager:
             # 将子文件夹移动到父文件夹
             cursor.execute("UPDATE academic_folders SET parent_id = %s WHERE parent_id = %s", (parent_id, folder_id))
             
+            # 子孙文件夹的路径去掉被删除的这一级：/a/b/x/... -> /a/b/...
+            parent_path = path[:-len(f"{folder_id}/")]
+            cursor.execute(
+                "UPDATE academic_folders SET path = CONCAT(%s, SUBSTRING(path, %s)) "
+                "WHERE user_id = %s AND path LIKE %s AND id != %s",
+                (parent_path, len(path) + 1, user_id, f"{path}%", folder_id)
+            )
+            
             # 删除文件夹
             cursor.execute("DELETE FROM academic_folders WHERE id = %s", (folder_id,))
             
-            db.commit()
-            return cursor.rowcount > 0
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            cursor.close()
-            db.close()
+            # 文件夹内的资源移到了父文件夹，资源列表也随之变化
+            _invalidate_cache(tx, f'folders:{user_id}')
+            _invalidate_cache(tx, f'resources:{user_id}')
+            return True
 
 class UserCategoryManager:
     """用户自定义分类管理器"""
@@ -531,46 +1208,44 @@ class UserCategoryManager:
     @staticmethod
     def create_category(name: str, user_id: int, description: str = '', color: str = '#6c757d') -> int:
         """创建用户自定义分类"""
-        db = get_db_connection()
-        cursor = db.cursor()
-        
-        try:
+        with transaction() as tx:
+            cursor = tx.cursor()
+            
             sql = """
             INSERT INTO user_categories (name, user_id, description, color) 
             VALUES (%s, %s, %s, %s)
             """
             cursor.execute(sql, (name, user_id, description, color))
             category_id = cursor.lastrowid
-            db.commit()
+            _invalidate_cache(tx, f'categories:{user_id}')
             return category_id
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            cursor.close()
-            db.close()
     
     @staticmethod
     def get_categories(user_id: int) -> List[Dict]:
-        """获取用户的所有分类"""
-        db = get_db_connection()
-        cursor = db.cursor(dictionary=True)
+        """获取用户的所有分类（带进程内缓存）"""
+        def load():
+            with read_session() as session:
+                cursor = session.cursor(dictionary=True)
+                
+                sql = "SELECT * FROM user_categories WHERE user_id = %s ORDER BY name"
+                cursor.execute(sql, (user_id,))
+                return cursor.fetchall()
         
-        try:
-            sql = "SELECT * FROM user_categories WHERE user_id = %s ORDER BY name"
-            cursor.execute(sql, (user_id,))
-            return cursor.fetchall()
-        finally:
-            cursor.close()
-            db.close()
+        return _cache.get(f'categories:{user_id}', load)
     
     @staticmethod
-    def update_category(category_id: int, name: str = None, description: str = None, color: str = None) -> bool:
-        """更新分类信息"""
-        db = get_db_connection()
-        cursor = db.cursor()
-        
-        try:
+    def _get_category_owner(cursor, category_id: int) -> Optional[int]:
+        cursor.execute("SELECT user_id FROM user_categories WHERE id = %s", (category_id,))
+        owner = cursor.fetchone()
+        return owner[0] if owner else None
+    
+    @staticmethod
+    def update_category(category_id: int, name: str = None, description: str = None, color: str = None,
+                        user_id: int = None) -> bool:
+        """更新分类信息，指定 user_id 时只更新该用户的分类"""
+        with transaction() as tx:
+            cursor = tx.cursor()
+            
             updates = []
             params = []
             
@@ -585,81 +1260,231 @@ class UserCategoryManager:
                 params.append(color)
             
             if updates:
+                owner_id = user_id if user_id is not None else UserCategoryManager._get_category_owner(cursor, category_id)
+                if owner_id is None:
+                    return False
+                
                 params.append(category_id)
                 sql = f"UPDATE user_categories SET {', '.join(updates)} WHERE id = %s"
+                if user_id is not None:
+                    sql += " AND user_id = %s"
+                    params.append(user_id)
                 cursor.execute(sql, params)
-                db.commit()
-                return cursor.rowcount > 0
+                if cursor.rowcount == 0:
+                    return False
+                _invalidate_cache(tx, f'categories:{owner_id}')
+                return True
             
             return False
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            cursor.close()
-            db.close()
     
     @staticmethod
-    def delete_category(category_id: int) -> bool:
-        """删除分类"""
-        db = get_db_connection()
-        cursor = db.cursor()
-        
-        try:
+    def delete_category(category_id: int, user_id: int = None) -> bool:
+        """删除分类，指定 user_id 时只删除该用户的分类"""
+        with transaction() as tx:
+            cursor = tx.cursor()
+            
+            owner_id = user_id if user_id is not None else UserCategoryManager._get_category_owner(cursor, category_id)
+            if owner_id is None:
+                return False
+            
+            # 删除分类（归属条件直接放在 DELETE 中）
+            sql = "DELETE FROM user_categories WHERE id = %s"
+            params = [category_id]
+            if user_id is not None:
+                sql += " AND user_id = %s"
+                params.append(user_id)
+            cursor.execute(sql, params)
+            if cursor.rowcount == 0:
+                return False
+            _invalidate_cache(tx, f'categories:{owner_id}')
+            
             # 将使用该分类的资源分类设为NULL
             cursor.execute("UPDATE academic_resources SET user_category_id = NULL WHERE user_category_id = %s", (category_id,))
+            _invalidate_cache(tx, f'resources:{owner_id}')
             
-            # 删除分类
-            cursor.execute("DELETE FROM user_categories WHERE id = %s", (category_id,))
-            
-            db.commit()
-            return cursor.rowcount > 0
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            cursor.close()
-            db.close()
+            return True
+
+# 计算哈希和写入文件时每次读取的字节数
+_FILE_CHUNK_SIZE = 1024 * 1024
+
+# 内容寻址存储的文件名：64 位十六进制 SHA-256 加扩展名
+_STORED_NAME = re.compile(r"^([0-9a-f]{64})(\.[^./\\]*)?$")
+
+_FILE_STORAGE_UPSERT_SQL = """
+INSERT INTO file_storage
+(filename, original_name, file_path, file_size, file_type, mime_type, uploader_id, related_type, sha256, ref_count)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 1)
+ON DUPLICATE KEY UPDATE ref_count = ref_count + 1
+"""
 
 class FileManager:
-    """文件管理器"""
+    """
+    文件管理器
+    上传文件按内容的 SHA-256 存储在 FILE_STORAGE_DIR/ab/cd/<sha256><扩展名>，相同内容只保存一份；
+    file_storage 中每个内容一行，ref_count 为引用它的资源数，归零后在提交后回收
+    """
+    
+    @staticmethod
+    def storage_path(sha256: str, file_ext: str = '') -> str:
+        """内容对应的存储路径，按哈希前两级各两个字符分散到子目录"""
+        return os.path.join(FILE_STORAGE_DIR, sha256[:2], sha256[2:4], sha256 + file_ext)
+    
+    @staticmethod
+    def _hash_stream(stream) -> Tuple[str, int]:
+        """流式计算 SHA-256，返回 (十六进制摘要, 字节数)"""
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in iter(lambda: stream.read(_FILE_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+        return digest.hexdigest(), size
+    
+    @staticmethod
+    def _write_stream(stream, directory: str) -> Tuple[str, str, int]:
+        """把流写入 directory 下的临时文件，同时计算 SHA-256，返回 (临时文件路径, 摘要, 字节数)"""
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: stream.read(_FILE_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return temp_path, digest.hexdigest(), size
+    
+    @staticmethod
+    def inspect_file(file) -> Dict:
+        """计算上传文件的 SHA-256 和大小，不保存（没有资源引用的文件不入库）"""
+        file_ext = os.path.splitext(file.filename)[1].lower()
+        stream = file.stream
+        seekable = stream.seekable() if hasattr(stream, 'seekable') else hasattr(stream, 'seek')
+        start = stream.tell() if seekable else None
+        sha256, file_size = FileManager._hash_stream(stream)
+        if seekable:
+            stream.seek(start)
+        return {
+            'original_name': file.filename,
+            'file_size': file_size,
+            'file_type': file_ext[1:] if file_ext else '',
+            'mime_type': file.content_type,
+            'sha256': sha256
+        }
     
     @staticmethod
     def save_file(file, user_id: int, file_type: str = 'academic', folder_id: int = None) -> Dict:
-        """保存上传的文件"""
-        # 生成唯一文件名
-        timestamp = int(time.time())
-        file_hash = hashlib.md5(f"{timestamp}_{file.filename}".encode()).hexdigest()[:8]
-        file_ext = os.path.splitext(file.filename)[1]
-        unique_filename = f"{timestamp}_{file_hash}{file_ext}"
-        
-        # 确定存储路径
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        upload_dir = os.path.join(base_dir, "static", "uploads", file_type)
-        
-        # 如果有文件夹ID，创建子文件夹
-        if folder_id:
-            upload_dir = os.path.join(upload_dir, f"folder_{folder_id}")
-        
-        os.makedirs(upload_dir, exist_ok=True)
+        """
+        保存上传的文件（folder_id 只为兼容保留，存储位置只取决于内容）
+        内容已存在时不写磁盘，引用计数加一；调用方须在同一事务中创建引用该文件的资源（本方法会加入外层事务），
+        事务回滚时删除本事务新写入的文件
+        """
+        file_ext = os.path.splitext(file.filename)[1].lower()
+        stream = file.stream
         
-        file_path = os.path.join(upload_dir, unique_filename)
+        # 可回读的流（Werkzeug 的上传文件）先只计算哈希，确认是新内容后再写入；否则边写临时文件边计算
+        temp_path = None
+        # Python 3.11 之前的 SpooledTemporaryFile 没有 seekable()
+        seekable = stream.seekable() if hasattr(stream, 'seekable') else hasattr(stream, 'seek')
+        if seekable:
+            start = stream.tell()
+            sha256, file_size = FileManager._hash_stream(stream)
+            stream.seek(start)
+        else:
+            temp_path, sha256, file_size = FileManager._write_stream(stream, FILE_STORAGE_DIR)
         
-        # 保存文件
-        file.save(file_path)
-        
-        # 获取文件信息
-        file_size = os.path.getsize(file_path)
+        try:
+            with transaction() as tx:
+                cursor = tx.cursor()
+                
+                file_path = FileManager.storage_path(sha256, file_ext)
+                cursor.execute(_FILE_STORAGE_UPSERT_SQL, (
+                    os.path.basename(file_path), file.filename, file_path, file_size, file_ext[1:],
+                    file.content_type, user_id, file_type, sha256
+                ))
+                # 已有记录时沿用其中的路径（可能是其他扩展名）
+                cursor.execute("SELECT file_path FROM file_storage WHERE sha256 = %s", (sha256,))
+                file_path = cursor.fetchone()[0]
+                
+                # 在持有该行锁时检查文件：新内容、或文件刚被回收时才写入（与 _collect 互斥）
+                if not os.path.exists(file_path):
+                    if temp_path is None:
+                        temp_path, _, _ = FileManager._write_stream(stream, os.path.dirname(file_path))
+                    else:
+                        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    os.replace(temp_path, file_path)
+                    temp_path = None
+                    # 回滚时记录随之消失，在释放行锁之前删除文件，同时上传相同内容的事务会等待并重新写入
+                    tx.on_rollback(lambda: FileManager.delete_file(file_path))
+        finally:
+            if temp_path is not None:
+                FileManager.delete_file(temp_path)
         
         return {
-            'filename': unique_filename,
+            'filename': os.path.basename(file_path),
             'original_name': file.filename,
             'file_path': file_path,
             'file_size': file_size,
             'file_type': file_ext[1:] if file_ext else '',
-            'mime_type': file.content_type
+            'mime_type': file.content_type,
+            'sha256': sha256
         }
     
+    @staticmethod
+    def release_files(tx, file_paths: List[str]):
+        """
+        资源不再引用这些文件（在删除资源的事务中调用）：引用计数减一，提交后回收计数归零的文件；
+        不是内容寻址存储的旧文件在提交后直接删除
+        """
+        counts = Counter()
+        for file_path in file_paths:
+            match = _STORED_NAME.match(os.path.basename(file_path or ''))
+            if match:
+                counts[match.group(1)] += 1
+            elif file_path:
+                tx.on_commit(lambda path=file_path: FileManager.delete_file(path))
+        if not counts:
+            return
+        
+        # 按减少量分组，每组一条 UPDATE
+        by_amount = {}
+        for sha256, amount in counts.items():
+            by_amount.setdefault(amount, []).append(sha256)
+        cursor = tx.cursor()
+        for amount, hashes in by_amount.items():
+            placeholders = ", ".join(["%s"] * len(hashes))
+            cursor.execute(
+                f"UPDATE file_storage SET ref_count = GREATEST(ref_count - %s, 0) WHERE sha256 IN ({placeholders})",
+                [amount] + hashes
+            )
+        hashes = list(counts)
+        tx.on_commit(lambda: FileManager._collect(hashes))
+    
+    @staticmethod
+    def _collect(hashes: List[str]):
+        """回收引用计数为 0 的文件：锁定记录后删除文件和记录，同时上传相同内容的请求会等待并重新写入"""
+        with transaction() as tx:
+            cursor = tx.cursor()
+            placeholders = ", ".join(["%s"] * len(hashes))
+            cursor.execute(
+                f"SELECT sha256, file_path FROM file_storage WHERE sha256 IN ({placeholders}) AND ref_count = 0 "
+                "FOR UPDATE",
+                hashes
+            )
+            unused = cursor.fetchall()
+            if not unused:
+                return
+            for _, file_path in unused:
+                FileManager.delete_file(file_path)
+            placeholders = ", ".join(["%s"] * len(unused))
+            cursor.execute(
+                f"DELETE FROM file_storage WHERE sha256 IN ({placeholders}) AND ref_count = 0",
+                [sha256 for sha256, _ in unused]
+            )
+    
     @staticmethod
     def delete_file(file_path: str) -> bool:
         """删除文件"""
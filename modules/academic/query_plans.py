@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学术资源查询执行计划检查
+在一个最终会回滚的事务中依次调用各管理器方法，记录它们发出的每条 SQL，
+对其中的 SELECT/UPDATE/DELETE 执行 EXPLAIN，标记全表扫描和文件排序
+
+用法:
+    python -m modules.academic.query_plans --user 用户ID
+
+存在问题时退出码为 1，可用于上线前检查。注意：表中数据很少时优化器可能主动选择全表扫描，
+需要在接近生产规模的数据上检查才有参考价值。
+"""
+
+import argparse
+import re
+import sys
+from typing import Callable, Dict, List, Tuple
+from database import transaction
+from modules.academic.models import (
+    AcademicResourceManager, SubjectManager, FolderManager, UserCategoryManager, encode_page_cursor
+)
+
+# 需要检查执行计划的语句
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|UPDATE|DELETE)\b", re.I)
+
+class _Rollback(Exception):
+    """检查结束后用于回滚事务"""
+
+class RecordingCursor:
+    """记录执行语句的游标包装"""
+
+    def __init__(self, cursor, recorder: 'StatementRecorder'):
+        self._cursor = cursor
+        self._recorder = recorder
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._recorder.record(operation, params)
+        return self._cursor.execute(operation, params, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+class StatementRecorder:
+    """按调用方法归类记录语句"""
+
+    def __init__(self):
+        self.current = None
+        self.statements: List[Tuple[str, str, tuple]] = []
+
+    def wrap(self, cursor):
+        return RecordingCursor(cursor, self)
+
+    def record(self, operation, params):
+        self.statements.append((self.current, operation, tuple(params or ())))
+
+def _sample_ids(tx, user_id: int) -> Dict:
+    """取该用户的一条资源、文件夹和分类作为调用参数"""
+    cursor = tx.connection.cursor(dictionary=True, buffered=True)
+    sample = {}
+    try:
+        cursor.execute(
+            "SELECT id, created_at FROM academic_resources WHERE author_id = %s ORDER BY id LIMIT 1",
+            (user_id,))
+        sample['resource'] = cursor.fetchone()
+        cursor.execute("SELECT id FROM academic_folders WHERE user_id = %s ORDER BY id LIMIT 1", (user_id,))
+        row = cursor.fetchone()
+        sample['folder_id'] = row['id'] if row else None
+        cursor.execute("SELECT id FROM user_categories WHERE user_id = %s ORDER BY id LIMIT 1", (user_id,))
+        row = cursor.fetchone()
+        sample['category_id'] = row['id'] if row else None
+    finally:
+        cursor.close()
+    return sample
+
+def _workload(user_id: int, sample: Dict) -> List[Tuple[str, Callable]]:
+    """要检查的管理器调用：(名称, 调用)"""
+    M = AcademicResourceManager
+    resource = sample.get('resource')
+    folder_id = sample.get('folder_id')
+    category_id = sample.get('category_id')
+
+    calls = [
+        ("get_resources", lambda: M.get_resources(user_id)),
+        ("get_resources(status)", lambda: M.get_resources(user_id, status='unread')),
+        ("get_resources(search, like)", lambda: M.get_resources(user_id, search='test', search_mode='like')),
+        ("get_resources(search, fulltext)", lambda: M.get_resources(user_id, search='test', search_mode='fulltext')),
+        ("get_resources_after", lambda: M.get_resources_after(user_id)),
+        ("get_resources(tag)", lambda: M.get_resources(user_id, tags=['执行计划检查'])),
+        ("get_resources(tags, and)", lambda: M.get_resources(user_id, tags=['执行计划检查', 'test'])),
+        ("get_resources(tags, or)", lambda: M.get_resources(user_id, tags=['执行计划检查', 'test'], tag_mode='or')),
+        ("SubjectManager.get_all_subjects", SubjectManager.get_all_subjects),
+        ("FolderManager.get_folders", lambda: FolderManager.get_folders(user_id)),
+        ("FolderManager.get_folder_tree", lambda: FolderManager.get_folder_tree(user_id)),
+        ("UserCategoryManager.get_categories", lambda: UserCategoryManager.get_categories(user_id)),
+        ("create_resource", lambda: M.create_resource({
+            'title': '执行计划检查', 'author_id': user_id, 'tags': ['执行计划检查']})),
+        ("create_resources", lambda: M.create_resources([
+            {'title': '执行计划检查', 'author_id': user_id, 'tags': ['执行计划检查']},
+            {'title': '执行计划检查', 'author_id': user_id, 'tags': ['执行计划检查', 'test']}])),
+    ]
+    if folder_id:
+        calls += [
+            ("get_resources(folder)", lambda: M.get_resources(user_id, folder_id=folder_id)),
+            ("get_resources(folder, descendants)",
+             lambda: M.get_resources(user_id, folder_id=folder_id, include_descendants=True)),
+            ("FolderManager.get_folders(parent)", lambda: FolderManager.get_folders(user_id, folder_id)),
+            ("FolderManager.get_subtree_ids", lambda: FolderManager.get_subtree_ids(user_id, folder_id)),
+            ("FolderManager.get_breadcrumbs", lambda: FolderManager.get_breadcrumbs(user_id, folder_id)),
+            ("FolderManager.update_folder", lambda: FolderManager.update_folder(folder_id, name='执行计划检查', user_id=user_id)),
+        ]
+    if category_id:
+        calls += [
+            ("get_resources(category)", lambda: M.get_resources(user_id, category_id=category_id)),
+            ("UserCategoryManager.update_category",
+             lambda: UserCategoryManager.update_category(category_id, name='执行计划检查', user_id=user_id)),
+        ]
+    if resource:
+        next_cursor = encode_page_cursor(resource['created_at'], resource['id'])
+        calls += [
+            ("get_resource", lambda: M.get_resource(resource['id'])),
+            ("get_resource_file", lambda: M.get_resource_file(resource['id'], user_id)),
+            ("get_resources_after(cursor)", lambda: M.get_resources_after(user_id, cursor=next_cursor)),
+            ("update_resource", lambda: M.update_resource(resource['id'], {
+                'title': '执行计划检查', 'tags': ['执行计划检查']}, user_id=user_id)),
+            ("batch_update(set_status)", lambda: M.batch_update(user_id, [resource['id']], 'set_status', 'reading')),
+            ("batch_update(add_tags)", lambda: M.batch_update(user_id, [resource['id']], 'add_tags', ['执行计划检查'])),
+            ("batch_update(remove_tags)",
+             lambda: M.batch_update(user_id, [resource['id']], 'remove_tags', ['执行计划检查'])),
+            ("delete_resource", lambda: M.delete_resource(resource['id'], user_id=user_id)),
+        ]
+    # 删除操作放在最后，避免影响前面调用的参数
+    if folder_id:
+        calls.append(("FolderManager.delete_folder", lambda: FolderManager.delete_folder(folder_id, user_id=user_id)))
+    if category_id:
+        calls.append(("UserCategoryManager.delete_category",
+                      lambda: UserCategoryManager.delete_category(category_id, user_id=user_id)))
+    return calls
+
+def _problems(plan_row: Dict) -> List[str]:
+    """从 EXPLAIN 的一行中找出问题"""
+    problems = []
+    extra = plan_row.get('Extra') or ''
+    if plan_row.get('type') == 'ALL':
+        problems.append("全表扫描")
+    if 'Using filesort' in extra:
+        problems.append("文件排序")
+    if 'Using temporary' in extra:
+        problems.append("临时表")
+    return problems
+
+def check_query_plans(user_id: int) -> int:
+    """执行检查并打印报告，返回存在问题的语句数"""
+    recorder = StatementRecorder()
+    flagged = 0
+    seen = set()
+
+    try:
+        with transaction() as tx:
+            sample = _sample_ids(tx, user_id)
+            tx.cursor_wrapper = recorder.wrap
+
+            for name, call in _workload(user_id, sample):
+                recorder.current = name
+                try:
+                    call()
+                except Exception as e:
+                    print(f"⚠ {name} 执行失败: {e}")
+            tx.cursor_wrapper = None
+
+            explain_cursor = tx.connection.cursor(dictionary=True, buffered=True)
+            for name, operation, params in recorder.statements:
+                sql = " ".join(operation.split())
+                if not _EXPLAINABLE.match(sql) or sql in seen:
+                    continue
+                seen.add(sql)
+
+                try:
+                    explain_cursor.execute(f"EXPLAIN {sql}", params)
+                    plan = explain_cursor.fetchall()
+                except Exception as e:
+                    print(f"⚠ [{name}] EXPLAIN 失败: {e}\n    {sql}")
+                    continue
+
+                issues = [(row, _problems(row)) for row in plan]
+                bad = [(row, problems) for row, problems in issues if problems]
+                mark = "✗" if bad else "✓"
+                print(f"{mark} [{name}] {sql[:160]}")
+                for row, problems in issues:
+                    print(f"    table={row.get('table')} type={row.get('type')} key={row.get('key')} "
+                          f"rows={row.get('rows')} extra={row.get('Extra') or ''}"
+                          + (f"  <- {'、'.join(problems)}" if problems else ""))
+                if bad:
+                    flagged += 1
+            explain_cursor.close()
+
+            # 检查过程中的写入全部回滚
+            raise _Rollback()
+    except _Rollback:
+        pass
+
+    print("-" * 60)
+    print(f"共检查 {len(seen)} 条语句，{flagged} 条存在全表扫描或文件排序")
+    return flagged
+
+def main():
+    parser = argparse.ArgumentParser(description="检查学术资源管理器查询的执行计划")
+    parser.add_argument("--user", type=int, required=True, help="用于生成查询参数的用户ID")
+    args = parser.parse_args()
+    sys.exit(1 if check_query_plans(args.user) else 0)
+
+if __name__ == "__main__":
+    main()
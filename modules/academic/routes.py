@@ -7,10 +7,21 @@
 
 import os
 import json
-from flask import Blueprint, request, jsonify, render_template, send_file, current_app, session
+import codecs
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import Blueprint, Response, request, jsonify, render_template, send_file, current_app, session, stream_with_context, make_response
 from werkzeug.utils import secure_filename
-from modules.academic.models import AcademicResourceManager, SubjectManager, FileManager, FolderManager, UserCategoryManager
+from modules.academic.models import AcademicResourceManager, SubjectManager, FileManager, FolderManager, UserCategoryManager, resolve_resource_fields, TAG_MODES, get_cache_versions
+from modules.academic import search as search_index
+from modules.academic import tag_index
+from modules.academic import importers
+from modules.academic import exporters
 from auth import login_required
+from database import transaction
+from config import RESOURCE_BATCH_MAX_SIZE, IMPORT_BATCH_SIZE
+from version import get_version
 
 # 创建蓝图
 academic_bp = Blueprint('academic', __name__, url_prefix='/academic')
@@ -23,6 +34,48 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def conditional_get(*scopes):
+    """
+    条件请求装饰器：用当前用户在 cache_versions 中的版本号（scopes 为名称前缀，如 folders）生成 ETag 和
+    Last-Modified，请求的 If-None-Match / If-Modified-Since 仍然有效时直接返回 304，不执行视图中的查询
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user_id = session.get('user_id')
+            try:
+                versions, last_modified = get_cache_versions([f'{scope}:{user_id}' for scope in scopes])
+            except Exception:
+                current_app.logger.exception("读取缓存版本号失败")
+                return f(*args, **kwargs)
+            
+            # 同一版本下响应只取决于用户、请求参数和程序版本
+            validator = f"{get_version()}|{user_id}|{versions}|{request.full_path}"
+            etag = hashlib.sha1(validator.encode('utf-8')).hexdigest()
+            
+            # 有 If-None-Match 时忽略 If-Modified-Since（RFC 7232）
+            not_modified = False
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            elif last_modified and request.if_modified_since:
+                since = request.if_modified_since
+                if since.tzinfo is None:
+                    since = since.replace(tzinfo=timezone.utc)
+                not_modified = last_modified <= since
+            
+            response = Response(status=304) if not_modified else make_response(f(*args, **kwargs))
+            if response.status_code in (200, 304):
+                # 压缩等编码会改变响应字节，使用弱校验值
+                response.set_etag(etag, weak=True)
+                if last_modified:
+                    response.last_modified = last_modified
+                # 浏览器每次都要带校验值回源确认
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
+
 @academic_bp.route('/')
 @login_required
 def index():
@@ -44,33 +97,106 @@ def test_session():
         'username': session.get('username')
     })
 
+def _resource_filters() -> dict:
+    """解析资源列表的筛选参数（列表和导出共用），参数不合法时抛出 ValueError"""
+    # 按标签筛选：tag 可重复传入多个，tag_mode 为 and（默认，全部命中）或 or（任意命中）
+    tag_mode = request.args.get('tag_mode', 'and')
+    if tag_mode not in TAG_MODES:
+        raise ValueError(f'tag_mode 只能是 {" / ".join(TAG_MODES)}')
+    
+    return {
+        'folder_id': request.args.get('folder_id', type=int),
+        'category_id': request.args.get('category_id', type=int),
+        'status': request.args.get('status'),
+        'search': request.args.get('search'),
+        # 按文件夹筛选时是否包含子文件夹中的资源
+        'include_descendants': request.args.get('include_descendants', '').lower() in ('1', 'true', 'yes'),
+        'tags': request.args.getlist('tag'),
+        'tag_mode': tag_mode
+    }
+
 @academic_bp.route('/api/resources', methods=['GET'])
 @login_required
+@conditional_get('resources', 'folders')
 def get_resources():
     """获取学术资源列表"""
     try:
         user_id = session.get('user_id')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
-        folder_id = request.args.get('folder_id', type=int)
-        category_id = request.args.get('category_id', type=int)
-        status = request.args.get('status')
-        search = request.args.get('search')
+        
+        # 筛选条件；只查询和返回需要的字段，默认为不含大文本列的摘要字段
+        try:
+            filters = _resource_filters()
+            fields = resolve_resource_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        # 搜索时使用全文索引，按相关度排序并返回高亮片段
+        if filters['search'] and search_index.is_enabled():
+            resources, total, highlights, total_capped = AcademicResourceManager.search_resources(
+                user_id=user_id,
+                page=page,
+                per_page=per_page,
+                fields=fields,
+                **filters
+            )
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'resources': [resource.to_dict(fields) for resource in resources],
+                    'highlights': highlights,
+                    'total': total,
+                    # 为 True 时 total 只统计了相关度最高的 SEARCH_MAX_HITS 条匹配
+                    'total_capped': total_capped,
+                    'page': page,
+                    'per_page': per_page,
+                    'pages': (total + per_page - 1) // per_page
+                }
+            })
+        
+        # 传入 cursor 参数（首页可为空）时使用 keyset 游标分页，不再统计总数
+        if 'cursor' in request.args:
+            try:
+                resources, next_cursor = AcademicResourceManager.get_resources_after(
+                    user_id=user_id,
+                    cursor=request.args.get('cursor') or None,
+                    per_page=per_page,
+                    fields=fields,
+                    **filters
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'resources': [resource.to_dict(fields) for resource in resources],
+                    'per_page': per_page,
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
+                }
+            })
         
         resources, total = AcademicResourceManager.get_resources(
             user_id=user_id,
             page=page,
             per_page=per_page,
-            folder_id=folder_id,
-            category_id=category_id,
-            status=status,
-            search=search
+            fields=fields,
+            **filters
         )
         
         return jsonify({
             'success': True,
             'data': {
-                'resources': [resource.to_dict() for resource in resources],
+                'resources': [resource.to_dict(fields) for resource in resources],
                 'total': total,
                 'page': page,
                 'per_page': per_page,
@@ -119,19 +245,23 @@ def create_resource():
                 'message': '标题不能为空'
             }), 400
         
-        # 处理文件上传
-        file_info = None
-        if 'file' in request.files:
-            file = request.files['file']
-            if file and file.filename and allowed_file(file.filename):
-                # 传递文件夹ID用于文件分类存储
-                file_info = FileManager.save_file(file, user_id, 'academic', 
-                                                int(folder_id) if folder_id else None)
-            elif file and file.filename:
-                return jsonify({
-                    'success': False,
-                    'message': '不支持的文件类型，仅支持 PDF、DOC、DOCX、TXT 格式'
-                }), 400
+        # 先校验全部表单字段，再保存文件
+        try:
+            publication_year = int(publication_year) if publication_year else None
+            folder_id = int(folder_id) if folder_id else None
+            user_category_id = int(user_category_id) if user_category_id else None
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': '出版年份、文件夹或分类参数无效'
+            }), 400
+        
+        file = request.files.get('file')
+        if file and file.filename and not allowed_file(file.filename):
+            return jsonify({
+                'success': False,
+                'message': '不支持的文件类型，仅支持 PDF、DOC、DOCX、TXT 格式'
+            }), 400
         
         # 准备资源数据
         resource_data = {
@@ -141,24 +271,26 @@ def create_resource():
             'content': content,
             'subject': subject,
             'keywords': keywords,
-            'publication_year': int(publication_year) if publication_year else None,
+            'publication_year': publication_year,
             'notes': notes,
             'author_id': user_id,
             'tags': tags,
-            'folder_id': int(folder_id) if folder_id else None,
-            'user_category_id': int(user_category_id) if user_category_id else None
+            'folder_id': folder_id,
+            'user_category_id': user_category_id
         }
         
-        # 添加文件信息
-        if file_info:
-            resource_data.update({
-                'file_path': file_info['file_path'],
-                'file_type': file_info['file_type'],
-                'file_size': file_info['file_size']
-            })
-        
-        # 创建资源
-        resource_id = AcademicResourceManager.create_resource(resource_data)
+        # 文件引用计数和资源在同一事务中写入，创建资源失败时引用一并回滚
+        with transaction():
+            if file and file.filename:
+                file_info = FileManager.save_file(file, user_id, 'academic')
+                resource_data.update({
+                    'file_path': file_info['file_path'],
+                    'file_type': file_info['file_type'],
+                    'file_size': file_info['file_size']
+                })
+            
+            # 创建资源
+            resource_id = AcademicResourceManager.create_resource(resource_data)
         
         return jsonify({
             'success': True,
@@ -211,21 +343,6 @@ def update_resource(resource_id):
     try:
         user_id = session.get('user_id')
         
-        # 检查资源是否存在
-        resource = AcademicResourceManager.get_resource(resource_id)
-        if not resource:
-            return jsonify({
-                'success': False,
-                'message': '资源不存在'
-            }), 404
-        
-        # 检查权限
-        if resource.author_id != user_id:
-            return jsonify({
-                'success': False,
-                'message': '无权限修改此资源'
-            }), 403
-        
         # 获取更新数据
         data = request.get_json()
         
@@ -244,8 +361,8 @@ def update_resource(resource_id):
         if 'tags' in data:
             update_data['tags'] = data['tags']
         
-        # 更新资源
-        success = AcademicResourceManager.update_resource(resource_id, update_data)
+        # 更新资源（只更新当前用户的资源）
+        success = AcademicResourceManager.update_resource(resource_id, update_data, user_id=user_id)
         
         if success:
             return jsonify({
@@ -255,8 +372,8 @@ def update_resource(resource_id):
         else:
             return jsonify({
                 'success': False,
-                'message': '资源更新失败'
-            }), 500
+                'message': '资源不存在或无权限修改'
+            }), 404
         
     except Exception as e:
         return jsonify({
@@ -271,39 +388,181 @@ def delete_resource(resource_id):
     try:
         user_id = session.get('user_id')
         
-        # 检查资源是否存在
-        resource = AcademicResourceManager.get_resource(resource_id)
-        if not resource:
+        # 删除资源（只删除当前用户的资源）
+        success = AcademicResourceManager.delete_resource(resource_id, user_id=user_id)
+        
+        if success:
+            return jsonify({
+                'success': True,
+                'message': '资源删除成功'
+            })
+        else:
             return jsonify({
                 'success': False,
-                'message': '资源不存在'
+                'message': '资源不存在或无权限删除'
             }), 404
         
-        # 检查权限
-        if resource.author_id != user_id:
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'删除资源失败: {str(e)}'
+        }), 500
+
+@academic_bp.route('/api/resources/batch', methods=['POST'])
+@login_required
+def batch_resources():
+    """
+    批量操作学术资源
+    请求体: {"ids": [...], "operation": "move|set_category|set_status|add_tags|remove_tags|delete", "value": ...}
+    """
+    try:
+        user_id = session.get('user_id')
+        data = request.get_json() or {}
+        
+        ids = data.get('ids')
+        if not isinstance(ids, list) or not ids:
             return jsonify({
                 'success': False,
-                'message': '无权限删除此资源'
-            }), 403
+                'message': 'ids 必须是非空列表'
+            }), 400
+        if len(ids) > RESOURCE_BATCH_MAX_SIZE:
+            return jsonify({
+                'success': False,
+                'message': f'单次最多操作 {RESOURCE_BATCH_MAX_SIZE} 个资源'
+            }), 400
         
-        # 删除资源
-        success = AcademicResourceManager.delete_resource(resource_id)
+        try:
+            results = AcademicResourceManager.batch_update(
+                user_id, ids, data.get('operation'), data.get('value'))
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
-        if success:
+        succeeded = sum(1 for result in results if result['success'])
+        return jsonify({
+            'success': True,
+            'message': f'批量操作完成：成功 {succeeded} 个，失败 {len(results) - succeeded} 个',
+            'data': {
+                'results': results,
+                'succeeded': succeeded,
+                'failed': len(results) - succeeded
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'批量操作失败: {str(e)}'
+        }), 500
+
+@academic_bp.route('/api/import', methods=['POST'])
+@login_required
+def import_resources():
+    """
+    从 BibTeX / RIS / CSV 文件批量导入学术资源
+    表单字段: file、format（默认按扩展名判断）、folder_id、tags（逗号分隔，添加到所有导入的资源）、batch_size
+    """
+    try:
+        user_id = session.get('user_id')
+        
+        if 'file' not in request.files or not request.files['file'].filename:
             return jsonify({
-                'success': True,
-                'message': '资源删除成功'
-            })
-        else:
+                'success': False,
+                'message': '没有选择文件'
+            }), 400
+        file = request.files['file']
+        
+        fmt = request.form.get('format') or importers.detect_format(file.filename)
+        if fmt not in importers.PARSERS:
+            return jsonify({
+                'success': False,
+                'message': '无法识别文件格式，请指定 format 为 bibtex、ris 或 csv'
+            }), 400
+        
+        folder_id = request.form.get('folder_id', type=int)
+        tags_str = request.form.get('tags', '')
+        tags = [t.strip() for t in tags_str.split(',') if t.strip()]
+        batch_size = min(max(request.form.get('batch_size', IMPORT_BATCH_SIZE, type=int), 1), IMPORT_BATCH_SIZE)
+        
+        # 逐行解码上传流，不把整个文件读入内存
+        lines = codecs.iterdecode(file.stream, 'utf-8-sig', errors='replace')
+        try:
+            report = importers.import_resources(user_id, lines, fmt, batch_size, folder_id, tags)
+        except ValueError as e:
             return jsonify({
                 'success': False,
-                'message': '资源删除失败'
-            }), 500
+                'message': str(e)
+            }), 400
         
+        return jsonify({
+            'success': True,
+            'message': f"导入完成：导入 {report['imported']} 条，跳过 {report['skipped']} 条，失败 {report['failed']} 条",
+            'data': report
+        })
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f'删除资源失败: {str(e)}'
+            'message': f'导入失败: {str(e)}'
+        }), 500
+
+@academic_bp.route('/api/export', methods=['GET'])
+@login_required
+def export_resources():
+    """流式导出学术资源：format 为 jsonl（默认）、csv 或 bibtex，筛选参数与资源列表相同"""
+    try:
+        user_id = session.get('user_id')
+        fmt = request.args.get('format', 'jsonl')
+        
+        if fmt not in exporters.EXPORT_FORMATS:
+            return jsonify({
+                'success': False,
+                'message': f'format 只能是 {" / ".join(exporters.EXPORT_FORMATS)}'
+            }), 400
+        
+        try:
+            filters = _resource_filters()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        try:
+            chunks = exporters.stream_export(user_id, fmt, **filters)
+        except exporters.ExportBusy as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 503
+        mimetype, extension = exporters.EXPORT_FORMATS[fmt]
+        return Response(
+            stream_with_context(chunks),
+            mimetype=f'{mimetype}; charset=utf-8',
+            headers={'Content-Disposition': f'attachment; filename=academic_resources.{extension}'}
+        )
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'导出失败: {str(e)}'
+        }), 500
+
+@academic_bp.route('/api/tags/suggest', methods=['GET'])
+@login_required
+def suggest_tags():
+    """标签自动补全：返回以 q 开头的标签，按使用次数排序"""
+    try:
+        prefix = request.args.get('q', '').strip()
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+        
+        return jsonify({
+            'success': True,
+            'data': tag_index.suggest(session['user_id'], prefix, limit)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取标签建议失败: {str(e)}'
         }), 500
 
 @academic_bp.route('/api/subjects', methods=['GET'])
@@ -346,12 +605,12 @@ def upload_file():
                 'message': '不支持的文件类型，仅支持 PDF、DOC、DOCX、TXT 格式'
             }), 400
         
-        user_id = session.get('user_id')
-        file_info = FileManager.save_file(file, user_id, 'academic')
+        # 单独上传的文件没有资源引用它，只校验并返回内容信息，不保存（文件随创建资源一起保存）
+        file_info = FileManager.inspect_file(file)
         
         return jsonify({
             'success': True,
-            'message': '文件上传成功',
+            'message': '文件校验通过',
             'data': file_info
         })
         
@@ -368,23 +627,16 @@ def download_file(resource_id):
     try:
         user_id = session.get('user_id')
         
-        # 获取资源信息
-        resource = AcademicResourceManager.get_resource(resource_id)
+        # 获取当前用户资源的文件信息
+        resource = AcademicResourceManager.get_resource_file(resource_id, user_id)
         if not resource:
             return jsonify({
                 'success': False,
-                'message': '资源不存在'
+                'message': '资源不存在或无权限下载'
             }), 404
         
-        # 检查权限
-        if resource.author_id != user_id:
-            return jsonify({
-                'success': False,
-                'message': '无权限下载此文件'
-            }), 403
-        
         # 检查文件是否存在
-        if not resource.file_path or not os.path.exists(resource.file_path):
+        if not resource['file_path'] or not os.path.exists(resource['file_path']):
             return jsonify({
                 'success': False,
                 'message': '文件不存在'
@@ -392,9 +644,9 @@ def download_file(resource_id):
         
         # 返回文件
         return send_file(
-            resource.file_path,
+            resource['file_path'],
             as_attachment=True,
-            download_name=resource.title + '.' + resource.file_type
+            download_name=resource['title'] + '.' + resource['file_type']
         )
         
     except Exception as e:
@@ -410,37 +662,30 @@ def preview_file(resource_id):
     try:
         user_id = session.get('user_id')
         
-        # 获取资源信息
-        resource = AcademicResourceManager.get_resource(resource_id)
+        # 获取当前用户资源的文件信息
+        resource = AcademicResourceManager.get_resource_file(resource_id, user_id)
         if not resource:
             return jsonify({
                 'success': False,
-                'message': '资源不存在'
+                'message': '资源不存在或无权限预览'
             }), 404
         
-        # 检查权限
-        if resource.author_id != user_id:
-            return jsonify({
-                'success': False,
-                'message': '无权限预览此文件'
-            }), 403
-        
         # 检查文件类型
-        if resource.file_type.lower() != 'pdf':
+        if (resource['file_type'] or '').lower() != 'pdf':
             return jsonify({
                 'success': False,
                 'message': '仅支持PDF文件预览'
             }), 400
         
         # 检查文件是否存在
-        if not resource.file_path or not os.path.exists(resource.file_path):
+        if not resource['file_path'] or not os.path.exists(resource['file_path']):
             return jsonify({
                 'success': False,
                 'message': '文件不存在'
             }), 404
         
         # 返回PDF文件用于预览
-        return send_file(resource.file_path, mimetype='application/pdf')
+        return send_file(resource['file_path'], mimetype='application/pdf')
         
     except Exception as e:
         return jsonify({
@@ -451,6 +696,7 @@ def preview_file(resource_id):
 # 文件夹管理API
 @academic_bp.route('/api/folders', methods=['GET'])
 @login_required
+@conditional_get('folders')
 def get_folders():
     """获取文件夹列表"""
     try:
@@ -474,6 +720,7 @@ def get_folders():
 
 @academic_bp.route('/api/folders/tree', methods=['GET'])
 @login_required
+@conditional_get('folders')
 def get_folder_tree():
     """获取文件夹树形结构"""
     try:
@@ -490,6 +737,30 @@ def get_folder_tree():
             'message': f'获取文件夹树失败: {str(e)}'
         }), 500
 
+@academic_bp.route('/api/folders/<int:folder_id>/breadcrumbs', methods=['GET'])
+@login_required
+def get_folder_breadcrumbs(folder_id):
+    """获取从根文件夹到指定文件夹的路径"""
+    try:
+        user_id = session.get('user_id')
+        breadcrumbs = FolderManager.get_breadcrumbs(user_id, folder_id)
+        
+        if not breadcrumbs:
+            return jsonify({
+                'success': False,
+                'message': '文件夹不存在或无权限'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': breadcrumbs
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取文件夹路径失败: {str(e)}'
+        }), 500
+
 @academic_bp.route('/api/folders', methods=['POST'])
 @login_required
 def create_folder():
@@ -516,6 +787,11 @@ def create_folder():
             'message': '文件夹创建成功',
             'data': {'folder_id': folder_id}
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -530,21 +806,19 @@ def update_folder(folder_id):
         user_id = session.get('user_id')
         data = request.get_json()
         
-        # 检查文件夹是否属于当前用户
-        folders = FolderManager.get_folders(user_id)
-        folder_exists = any(f['id'] == folder_id for f in folders)
-        
-        if not folder_exists:
+        if not any(data.get(field) is not None for field in ('name', 'description', 'color')):
             return jsonify({
                 'success': False,
-                'message': '文件夹不存在或无权限'
-            }), 403
+                'message': '没有需要更新的字段'
+            }), 400
         
+        # 只更新当前用户的文件夹，不存在或不属于当前用户时不会匹配任何行
         success = FolderManager.update_folder(
             folder_id,
             name=data.get('name'),
             description=data.get('description'),
-            color=data.get('color')
+            color=data.get('color'),
+            user_id=user_id
         )
         
         if success:
@@ -555,8 +829,8 @@ def update_folder(folder_id):
         else:
             return jsonify({
                 'success': False,
-                'message': '文件夹更新失败'
-            }), 500
+                'message': '文件夹不存在或无权限'
+            }), 403
     except Exception as e:
         return jsonify({
             'success': False,
@@ -570,17 +844,8 @@ def delete_folder(folder_id):
     try:
         user_id = session.get('user_id')
         
-        # 检查文件夹是否属于当前用户
-        folders = FolderManager.get_folders(user_id)
-        folder_exists = any(f['id'] == folder_id for f in folders)
-        
-        if not folder_exists:
-            return jsonify({
-                'success': False,
-                'message': '文件夹不存在或无权限'
-            }), 403
-        
-        success = FolderManager.delete_folder(folder_id)
+        # 只删除当前用户的文件夹
+        success = FolderManager.delete_folder(folder_id, user_id=user_id)
         
         if success:
             return jsonify({
@@ -590,8 +855,8 @@ def delete_folder(folder_id):
         else:
             return jsonify({
                 'success': False,
-                'message': '文件夹删除失败'
-            }), 500
+                'message': '文件夹不存在或无权限'
+            }), 403
     except Exception as e:
         return jsonify({
             'success': False,
@@ -601,6 +866,7 @@ def delete_folder(folder_id):
 # 用户分类管理API
 @academic_bp.route('/api/categories', methods=['GET'])
 @login_required
+@conditional_get('categories')
 def get_user_categories():
     """获取用户自定义分类"""
     try:
@@ -656,21 +922,19 @@ def update_user_category(category_id):
         user_id = session.get('user_id')
         data = request.get_json()
         
-        # 检查分类是否属于当前用户
-        categories = UserCategoryManager.get_categories(user_id)
-        category_exists = any(c['id'] == category_id for c in categories)
-        
-        if not category_exists:
+        if not any(data.get(field) is not None for field in ('name', 'description', 'color')):
             return jsonify({
                 'success': False,
-                'message': '分类不存在或无权限'
-            }), 403
+                'message': '没有需要更新的字段'
+            }), 400
         
+        # 只更新当前用户的分类，不存在或不属于当前用户时不会匹配任何行
         success = UserCategoryManager.update_category(
             category_id,
             name=data.get('name'),
             description=data.get('description'),
-            color=data.get('color')
+            color=data.get('color'),
+            user_id=user_id
         )
         
         if success:
@@ -681,8 +945,8 @@ def update_user_category(category_id):
         else:
             return jsonify({
                 'success': False,
-                'message': '分类更新失败'
-            }), 500
+                'message': '分类不存在或无权限'
+            }), 403
     except Exception as e:
         return jsonify({
             'success': False,
@@ -696,17 +960,8 @@ def delete_user_category(category_id):
     try:
         user_id = session.get('user_id')
         
-        # 检查分类是否属于当前用户
-        categories = UserCategoryManager.get_categories(user_id)
-        category_exists = any(c['id'] == category_id for c in categories)
-        
-        if not category_exists:
-            return jsonify({
-                'success': False,
-                'message': '分类不存在或无权限'
-            }), 403
-        
-        success = UserCategoryManager.delete_category(category_id)
+        # 只删除当前用户的分类
+        success = UserCategoryManager.delete_category(category_id, user_id=user_id)
         
         if success:
             return jsonify({
@@ -716,8 +971,8 @@ def delete_user_category(category_id):
         else:
             return jsonify({
                 'success': False,
-                'message': '分类删除失败'
-            }), 500
+                'message': '分类不存在或无权限'
+            }), 403
     except Exception as e:
         return jsonify({
             'success': False,
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学术资源全文检索
+基于 Whoosh 为资源的 title/authors/abstract/keywords/notes 建立索引，查询时按用户过滤；
+索引随资源的增删改增量更新，也可以离线全量重建
+
+用法:
+    python -m modules.academic.search rebuild [--user 用户ID]
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import SEARCH_BACKEND, SEARCH_INDEX_DIR, SEARCH_MAX_HITS
+
+try:
+    from whoosh import index as whoosh_index
+    from whoosh.analysis import Tokenizer, Token, LowercaseFilter
+    from whoosh.fields import Schema, ID, TEXT
+    from whoosh.highlight import ContextFragmenter, HtmlFormatter
+    from whoosh.qparser import MultifieldParser
+    from whoosh.query import Or, Term
+    from whoosh.writing import AsyncWriter
+    WHOOSH_AVAILABLE = True
+except ImportError:
+    WHOOSH_AVAILABLE = False
+
+# 建立索引的字段及查询权重
+SEARCH_FIELDS = ('title', 'authors', 'abstract', 'keywords', 'notes')
+FIELD_BOOSTS = {'title': 3.0, 'authors': 2.0, 'keywords': 2.0, 'abstract': 1.0, 'notes': 0.5}
+
+# 返回高亮片段的字段（需要在索引中存储原文）
+HIGHLIGHT_FIELDS = ('title', 'authors', 'abstract', 'keywords')
+
+_CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK_RE = re.compile(f"[{_CJK_CHARS}]")
+_TOKEN_RE = re.compile(f"[{_CJK_CHARS}]+|(?:(?![{_CJK_CHARS}])\\w)+")
+
+# 全量重建完成后写入的标记文件：没有标记时索引不完整，检索回退到数据库
+_READY_MARKER = os.path.join(SEARCH_INDEX_DIR, "REBUILD_COMPLETE")
+
+_index = None
+_index_lock = threading.Lock()
+
+if WHOOSH_AVAILABLE:
+    class CJKBigramTokenizer(Tokenizer):
+        """分词器：拉丁文字按单词切分，中日韩文字按相邻二字切分（单字成词时保留单字）"""
+
+        def __call__(self, value, positions=False, chars=False, keeporiginal=False,
+                     removestops=True, start_pos=0, start_char=0, tokenize=True,
+                     mode='', **kwargs):
+            t = Token(positions, chars, removestops=removestops, mode=mode, **kwargs)
+            if not tokenize:
+                t.original = t.text = value
+                t.boost = 1.0
+                if positions:
+                    t.pos = start_pos
+                if chars:
+                    t.startchar = start_char
+                    t.endchar = start_char + len(value)
+                yield t
+                return
+
+            pos = start_pos
+            for match in _TOKEN_RE.finditer(value):
+                text = match.group()
+                start = match.start()
+                if len(text) > 1 and _CJK_RE.match(text):
+                    pieces = [(text[i:i + 2], start + i, start + i + 2) for i in range(len(text) - 1)]
+                else:
+                    pieces = [(text, start, match.end())]
+
+                for piece, piece_start, piece_end in pieces:
+                    t.text = piece
+                    t.boost = 1.0
+                    t.stopped = False
+                    if keeporiginal:
+                        t.original = piece
+                    if positions:
+                        t.pos = pos
+                        pos += 1
+                    if chars:
+                        t.startchar = start_char + piece_start
+                        t.endchar = start_char + piece_end
+                    yield t
+
+    def _build_schema():
+        analyzer = CJKBigramTokenizer() | LowercaseFilter()
+        text_fields = {
+            name: TEXT(analyzer=analyzer, stored=name in HIGHLIGHT_FIELDS,
+                       field_boost=FIELD_BOOSTS[name], multitoken_query='phrase')
+            for name in SEARCH_FIELDS
+        }
+        return Schema(id=ID(stored=True, unique=True), author_id=ID(stored=True), **text_fields)
+
+def is_enabled() -> bool:
+    """是否使用 Whoosh 索引检索"""
+    return WHOOSH_AVAILABLE and SEARCH_BACKEND == 'whoosh'
+
+def is_ready() -> bool:
+    """索引是否已完成全量构建，可以用于检索"""
+    return is_enabled() and os.path.exists(_READY_MARKER)
+
+def get_index(create: bool = False):
+    """打开索引（首次调用时缓存），不存在且 create=False 时返回 None"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if whoosh_index.exists_in(SEARCH_INDEX_DIR):
+                    _index = whoosh_index.open_dir(SEARCH_INDEX_DIR)
+                elif create:
+                    os.makedirs(SEARCH_INDEX_DIR, exist_ok=True)
+                    _index = whoosh_index.create_in(SEARCH_INDEX_DIR, _build_schema())
+    return _index
+
+def _document(row: Dict) -> Dict:
+    """把资源行转换为索引文档"""
+    keywords = row.get('keywords') or []
+    if isinstance(keywords, str):
+        keywords = json.loads(keywords) if keywords else []
+    doc = {
+        'id': str(row['id']),
+        'author_id': str(row['author_id']),
+        'keywords': ' '.join(str(k) for k in keywords)
+    }
+    for name in ('title', 'authors', 'abstract', 'notes'):
+        doc[name] = row.get(name) or ''
+    return doc
+
+def index_resources(rows: Iterable[Dict]):
+    """新增或更新资源的索引文档；索引还不存在时不创建（只含部分文档的索引没有意义，由 rebuild 全量建立）"""
+    if not is_enabled() or get_index() is None:
+        return
+    writer = AsyncWriter(get_index())
+    for row in rows:
+        writer.update_document(**_document(row))
+    writer.commit()
+
+def remove_resources(resource_ids: Iterable[int]):
+    """从索引中删除资源"""
+    if not is_enabled() or get_index() is None:
+        return
+    writer = AsyncWriter(get_index())
+    for resource_id in resource_ids:
+        writer.delete_by_term('id', str(resource_id))
+    writer.commit()
+
+def _parse(query: str):
+    parser = MultifieldParser(list(SEARCH_FIELDS), schema=get_index().schema, fieldboosts=FIELD_BOOSTS)
+    return parser.parse(query)
+
+def search_ids(user_id: int, query: str, limit: Optional[int] = SEARCH_MAX_HITS) -> Tuple[List[int], bool]:
+    """
+    按相关度返回用户资源中匹配的前 limit 个资源ID（limit 为 None 时返回全部），
+    以及匹配数是否超过 limit（结果被截断）
+    """
+    if get_index() is None:
+        return [], False
+    with get_index().searcher() as searcher:
+        results = searcher.search(_parse(query), filter=Term('author_id', str(user_id)), limit=limit)
+        return [int(hit['id']) for hit in results], limit is not None and len(results) > limit
+
+def highlights(user_id: int, query: str, resource_ids: List[int]) -> Dict[int, Dict[str, str]]:
+    """为指定资源生成高亮片段，返回 {资源ID: {字段: HTML片段}}"""
+    if get_index() is None or not resource_ids:
+        return {}
+    ids_filter = Or([Term('id', str(resource_id)) for resource_id in resource_ids])
+    with get_index().searcher() as searcher:
+        results = searcher.search(_parse(query), filter=ids_filter, limit=len(resource_ids))
+        results.fragmenter = ContextFragmenter(maxchars=200, surround=40)
+        results.formatter = HtmlFormatter(tagname='mark', between='…')
+        snippets = {}
+        for hit in results:
+            if hit['author_id'] != str(user_id):
+                continue
+            fields = {}
+            for name in HIGHLIGHT_FIELDS:
+                fragment = hit.highlights(name)
+                if fragment:
+                    fields[name] = fragment
+            snippets[int(hit['id'])] = fields
+        return snippets
+
+def rebuild(user_id: int = None, batch_size: int = 500) -> int:
+    """从数据库全量重建索引（指定 user_id 时只重建该用户），返回写入的文档数"""
+    global _index
+    from database import read_session
+
+    if user_id is None:
+        # 全量重建：清空后重新创建索引目录，完成前检索回退到数据库
+        os.makedirs(SEARCH_INDEX_DIR, exist_ok=True)
+        if os.path.exists(_READY_MARKER):
+            os.remove(_READY_MARKER)
+        with _index_lock:
+            _index = whoosh_index.create_in(SEARCH_INDEX_DIR, _build_schema())
+    ix = get_index(create=True)
+
+    writer = ix.writer(limitmb=256)
+    if user_id is not None:
+        writer.delete_by_term('author_id', str(user_id))
+
+    count = 0
+    last_id = 0
+    try:
+        with read_session() as session:
+            cursor = session.cursor(dictionary=True)
+            while True:
+                sql = ("SELECT id, author_id, title, authors, abstract, keywords, notes "
+                       "FROM academic_resources WHERE id > %s")
+                params = [last_id]
+                if user_id is not None:
+                    sql += " AND author_id = %s"
+                    params.append(user_id)
+                cursor.execute(sql + " ORDER BY id LIMIT %s", params + [batch_size])
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    writer.add_document(**_document(row))
+                count += len(rows)
+                last_id = rows[-1]['id']
+        writer.commit()
+    except Exception:
+        writer.cancel()
+        raise
+    if user_id is None:
+        with open(_READY_MARKER, "w") as f:
+            f.write(f"{count}\n")
+    return count
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="学术资源全文索引")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="从数据库重建索引")
+    rebuild_parser.add_argument("--user", type=int, help="只重建指定用户的资源")
+    rebuild_parser.add_argument("--batch-size", type=int, default=500, help="每批读取的行数")
+    args = parser.parse_args()
+
+    if not WHOOSH_AVAILABLE:
+        print("❌ 未安装 whoosh，请先执行 pip install whoosh")
+        raise SystemExit(1)
+
+    total = rebuild(args.user, args.batch_size)
+    print(f"✓ 索引重建完成，共写入 {total} 条资源")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标签自动补全索引
+每个进程在内存中为最近使用过的用户各维护一个按名称排序的标签数组（只含该用户的资源关联过的标签，
+使用次数也只统计该用户的资源），用 bisect 找出前缀匹配的区间，按使用次数排序返回；
+本进程内的标签增删在事务提交后增量更新，其他进程的写入靠定期从数据库重新加载获得
+"""
+
+import bisect
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import TAG_INDEX_REFRESH_SECONDS, TAG_INDEX_MAX_USERS
+
+# 前缀区间的上界：比任何以该前缀开头的名称都大
+_MAX_CHAR = "\U0010ffff"
+
+class TagPrefixIndex:
+    """按名称前缀查找标签的有序数组索引（线程安全）"""
+
+    def __init__(self):
+        self._keys: List[Tuple[str, int]] = []      # 按 (casefold 名称, 标签ID) 排序
+        self._tags: Dict[int, List] = {}            # 标签ID -> [名称, 使用次数]
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+
+    def load(self, rows: Iterable[Tuple[int, str, int]]):
+        """用 (id, name, usage_count) 全量替换索引内容"""
+        tags = {tag_id: [name, usage_count or 0] for tag_id, name, usage_count in rows}
+        keys = sorted((name.casefold(), tag_id) for tag_id, (name, _) in tags.items())
+        with self._lock:
+            self._tags = tags
+            self._keys = keys
+            self.loaded_at = time.monotonic()
+
+    def add_usage(self, tags: Iterable[Tuple[int, Optional[str]]], delta: int):
+        """调整标签的使用次数，索引中还没有的标签（新建的标签）在给出名称时插入"""
+        with self._lock:
+            for tag_id, name in tags:
+                entry = self._tags.get(tag_id)
+                if entry is None:
+                    if name is None:
+                        continue
+                    self._tags[tag_id] = [name, max(delta, 0)]
+                    bisect.insort(self._keys, (name.casefold(), tag_id))
+                else:
+                    entry[1] = max(entry[1] + delta, 0)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """返回名称以 prefix 开头（不区分大小写）的标签，按使用次数从高到低"""
+        key = prefix.casefold()
+        with self._lock:
+            start = bisect.bisect_left(self._keys, (key,))
+            end = bisect.bisect_left(self._keys, (key + _MAX_CHAR,))
+            # 使用次数减到 0 的标签（该用户已不再使用）不再提示
+            candidates = [self._tags[tag_id] for _, tag_id in self._keys[start:end] if self._tags[tag_id][1] > 0]
+            top = heapq.nsmallest(limit, candidates, key=lambda entry: (-entry[1], entry[0].casefold()))
+            return [{'name': name, 'usage_count': usage_count} for name, usage_count in top]
+
+    def __len__(self):
+        return len(self._tags)
+
+# 用户ID -> 该用户的索引，按最近使用排序（最久未使用的在最前）
+_indexes: "OrderedDict[int, TagPrefixIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def refresh(user_id: int, index: TagPrefixIndex):
+    """从数据库加载用户的资源关联过的标签及其在该用户资源中的使用次数"""
+    from database import read_session
+
+    with read_session() as session:
+        cursor = session.cursor()
+        cursor.execute(
+            "SELECT t.id, t.name, COUNT(*) FROM academic_resource_tags rt "
+            "JOIN academic_resources r ON r.id = rt.resource_id "
+            "JOIN tags t ON t.id = rt.tag_id "
+            "WHERE r.author_id = %s GROUP BY t.id, t.name",
+            (user_id,)
+        )
+        index.load(cursor.fetchall())
+
+def _get_index(user_id: int) -> TagPrefixIndex:
+    """取用户的索引，没有时创建（超过 TAG_INDEX_MAX_USERS 个用户时丢弃最久未使用的）"""
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        if index is None:
+            index = _indexes[user_id] = TagPrefixIndex()
+            while len(_indexes) > TAG_INDEX_MAX_USERS:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(user_id)
+        return index
+
+def _ensure_fresh(user_id: int, index: TagPrefixIndex):
+    """首次使用时同步加载；超过刷新间隔后由一个线程刷新，其他线程继续使用旧数据"""
+    if index.loaded_at is None:
+        with index.refresh_lock:
+            if index.loaded_at is None:
+                refresh(user_id, index)
+        return
+    if time.monotonic() - index.loaded_at < TAG_INDEX_REFRESH_SECONDS:
+        return
+    if index.refresh_lock.acquire(blocking=False):
+        try:
+            refresh(user_id, index)
+        finally:
+            index.refresh_lock.release()
+
+def suggest(user_id: int, prefix: str, limit: int = 10) -> List[Dict]:
+    """用户的标签自动补全：[{name, usage_count}]"""
+    index = _get_index(user_id)
+    _ensure_fresh(user_id, index)
+    return index.suggest(prefix, limit)
+
+def _loaded_index(user_id: int) -> Optional[TagPrefixIndex]:
+    """已加载的用户索引，未加载的不需要增量更新（首次查询时会从数据库加载）"""
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+    return index if index is not None and index.loaded_at is not None else None
+
+def record_linked(user_id: int, tags: Iterable[Tuple[int, str]]):
+    """用户的资源新关联了这些 (标签ID, 名称)"""
+    index = _loaded_index(user_id)
+    if index is not None:
+        index.add_usage(tags, 1)
+
+def record_unlinked(user_id: int, tag_ids: Iterable[int]):
+    """用户的资源取消关联了这些标签"""
+    index = _loaded_index(user_id)
+    if index is not None:
+        index.add_usage(((tag_id, None) for tag_id in tag_ids), -1)